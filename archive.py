@@ -0,0 +1,223 @@
+import argparse
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from storage import get_storage
+
+# ==============================
+# Load Environment Variables
+# ==============================
+
+load_dotenv()
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+# Table -> timestamp column used for the retention cutoff.
+# Ordered so dependent rows leave the hot tables before their parents.
+# news_hashes is never archived: it keeps archived news deduplicated.
+ARCHIVE_TABLES = {
+    "processed_events": "processed_at",
+    "raw_news": "fetched_at",
+    "prices": "created_at"
+}
+
+MANIFEST_NAME = "manifest.json"
+
+# ==============================
+# Manifest
+# ==============================
+
+def manifest_path(archive_dir):
+    return os.path.join(archive_dir, MANIFEST_NAME)
+
+
+def load_manifest(archive_dir):
+    path = manifest_path(archive_dir)
+
+    if not os.path.exists(path):
+        return {"files": []}
+
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(archive_dir, manifest):
+    path = manifest_path(archive_dir)
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    os.replace(tmp_path, path)
+
+# ==============================
+# Partition Files
+# ==============================
+
+def row_day(row, ts_column):
+    return str(row.get(ts_column) or "unknown")[:10]
+
+
+def write_partitions(archive_dir, manifest, table, ts_column, rows, part_tag):
+    days = {}
+
+    for row in rows:
+        days.setdefault(row_day(row, ts_column), []).append(row)
+
+    for day, day_rows in sorted(days.items()):
+        relative = os.path.join(table, f"day={day}", f"part-{part_tag}.jsonl.gz")
+        path = os.path.join(archive_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for row in day_rows:
+                f.write(json.dumps(row, default=str) + "\n")
+
+        timestamps = [str(r[ts_column]) for r in day_rows if r.get(ts_column)]
+
+        manifest["files"].append({
+            "table": table,
+            "day": day,
+            "path": relative,
+            "rows": len(day_rows),
+            "min_ts": min(timestamps) if timestamps else None,
+            "max_ts": max(timestamps) if timestamps else None,
+            "archived_at": datetime.now(timezone.utc).isoformat()
+        })
+
+    # Manifest is saved before the hot rows are deleted
+    save_manifest(archive_dir, manifest)
+
+# ==============================
+# Reading the Archive
+# ==============================
+
+def iter_archived_rows(table, archive_dir=ARCHIVE_DIR):
+    manifest = load_manifest(archive_dir)
+
+    entries = sorted(
+        (e for e in manifest["files"] if e["table"] == table),
+        key=lambda e: (e["day"], e["path"])
+    )
+
+    seen_ids = set()
+    current_day = None
+
+    for entry in entries:
+        # A row always lands in the same day partition, so duplicates can only
+        # occur within one day and memory stays bounded by the largest day
+        if entry["day"] != current_day:
+            seen_ids = set()
+            current_day = entry["day"]
+
+        with gzip.open(os.path.join(archive_dir, entry["path"]), "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+
+                # A batch interrupted between write and delete is archived twice
+                row_id = row.get("id")
+                if row_id is not None:
+                    if row_id in seen_ids:
+                        continue
+                    seen_ids.add(row_id)
+
+                yield row
+
+# ==============================
+# Archive Job
+# ==============================
+
+def archive_table(storage, table, ts_column, cutoff, archive_dir, batch_size):
+    print(f"Archiving {table} rows older than {cutoff}...")
+
+    manifest = load_manifest(archive_dir)
+    run_tag = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+
+    archived = 0
+    kept = 0
+    batch_number = 0
+
+    while True:
+        rows = storage.fetch_expired_rows(table, ts_column, cutoff, kept, batch_size)
+
+        if not rows:
+            break
+
+        if table == "raw_news":
+            # Rows still referenced by hot events or signals cannot be deleted
+            referenced = storage.referenced_news_ids([r["id"] for r in rows])
+            kept += sum(1 for r in rows if r["id"] in referenced)
+            rows = [r for r in rows if r["id"] not in referenced]
+
+            if not rows:
+                continue
+
+        write_partitions(archive_dir, manifest, table, ts_column, rows, f"{run_tag}-{batch_number:05d}")
+        storage.delete_rows(table, [r["id"] for r in rows])
+
+        archived += len(rows)
+        batch_number += 1
+
+    print(f"Archived {archived} {table} rows ({kept} kept hot).")
+    return archived
+
+def backfill_news_hashes(storage, archive_dir, batch_size):
+    # Restores dedup keys for news archived before news_hashes existed
+    batch = []
+    restored = 0
+
+    for row in iter_archived_rows("raw_news", archive_dir):
+        if row.get("hash_signature"):
+            batch.append(row["hash_signature"])
+
+        if len(batch) >= batch_size:
+            storage.record_news_hashes(batch)
+            restored += len(batch)
+            batch = []
+
+    if batch:
+        storage.record_news_hashes(batch)
+        restored += len(batch)
+
+    print(f"Recorded {restored} archived news hashes.")
+
+# ==============================
+# Main
+# ==============================
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old rows from hot tables into the archive.")
+    parser.add_argument("--retention-days", type=int, default=ARCHIVE_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--tables", default=",".join(ARCHIVE_TABLES))
+    parser.add_argument("--backfill-hashes", action="store_true",
+                        help="record news_hashes for already archived raw_news and exit")
+    args = parser.parse_args()
+
+    storage = get_storage()
+
+    if args.backfill_hashes:
+        backfill_news_hashes(storage, args.archive_dir, args.batch_size)
+        return
+
+    cutoff = (
+        datetime.now(timezone.utc) - timedelta(days=args.retention_days)
+    ).isoformat()
+
+    started = time.time()
+
+    for table, ts_column in ARCHIVE_TABLES.items():
+        if table in args.tables.split(","):
+            archive_table(storage, table, ts_column, cutoff, args.archive_dir, args.batch_size)
+
+    print(f"Archival completed in {time.time() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# ==============================
+# Circuit Breaker Settings
+# ==============================
+
+HEALTH_PATH = os.getenv("FETCH_HEALTH_PATH", ".cache/fetch_health.json")
+FAILURE_THRESHOLD = int(os.getenv("FETCH_FAILURE_THRESHOLD", "3"))
+BASE_BACKOFF_SECONDS = int(os.getenv("FETCH_BASE_BACKOFF", "60"))
+MAX_BACKOFF_SECONDS = int(os.getenv("FETCH_MAX_BACKOFF", "21600"))
+
+# Weight of the newest observation in the moving averages
+EWMA_ALPHA = 0.2
+
+_lock = threading.Lock()
+_cache = {"stamp": None, "state": {}}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+# ==============================
+# Persistent State
+# ==============================
+# Several jobs (ingestion, index sync, price snapshots) share the file, so
+# every update re-reads it and writes it back under an exclusive file lock.
+
+@contextmanager
+def file_lock():
+    directory = os.path.dirname(HEALTH_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(f"{HEALTH_PATH}.lock", "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_file():
+    if not os.path.exists(HEALTH_PATH):
+        return {}
+
+    try:
+        with open(HEALTH_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠ Ignoring unreadable health file {HEALTH_PATH}: {e}")
+        return {}
+
+
+def file_stamp():
+    # os.replace gives the file a new inode, so this changes on every write
+    # even where mtime resolution is coarse
+    stat = os.stat(HEALTH_PATH)
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def load_state():
+    # Re-read only when another process has replaced the file
+    try:
+        stamp = file_stamp()
+    except FileNotFoundError:
+        return {}
+
+    if stamp != _cache["stamp"]:
+        _cache["state"] = read_file()
+        _cache["stamp"] = stamp
+
+    return _cache["state"]
+
+
+def update_state(apply):
+    with _lock, file_lock():
+        state = read_file()
+        apply(state)
+
+        # Per-process temp name so concurrent writers never share it
+        tmp_path = f"{HEALTH_PATH}.{os.getpid()}.tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+
+        os.replace(tmp_path, HEALTH_PATH)
+
+        _cache["state"] = state
+        _cache["stamp"] = file_stamp()
+
+
+def new_record():
+    return {
+        "successes": 0,
+        "failures": 0,
+        "consecutive_failures": 0,
+        "success_rate": 1.0,
+        "avg_latency_ms": None,
+        "open_until": 0,
+        "last_success_at": None,
+        "last_failure_at": None,
+        "last_error": None
+    }
+
+
+def source_record(source_key):
+    return load_state().get(source_key) or new_record()
+
+# ==============================
+# Recording Outcomes
+# ==============================
+
+def record_success(source_key, latency_ms):
+    def apply(state):
+        record = state.setdefault(source_key, new_record())
+
+        record["successes"] += 1
+        record["consecutive_failures"] = 0
+        record["open_until"] = 0
+        record["success_rate"] += EWMA_ALPHA * (1.0 - record["success_rate"])
+        record["last_success_at"] = datetime.now(timezone.utc).isoformat()
+
+        if record["avg_latency_ms"] is None:
+            record["avg_latency_ms"] = latency_ms
+        else:
+            record["avg_latency_ms"] += EWMA_ALPHA * (latency_ms - record["avg_latency_ms"])
+
+    update_state(apply)
+
+
+def record_failure(source_key, error):
+    def apply(state):
+        record = state.setdefault(source_key, new_record())
+
+        record["failures"] += 1
+        record["consecutive_failures"] += 1
+        record["success_rate"] -= EWMA_ALPHA * record["success_rate"]
+        record["last_failure_at"] = datetime.now(timezone.utc).isoformat()
+        record["last_error"] = str(error)[:200]
+
+        # Exponential backoff once the threshold is reached; the next call
+        # after open_until is let through as a probe
+        excess = record["consecutive_failures"] - FAILURE_THRESHOLD
+
+        if excess >= 0:
+            backoff = min(BASE_BACKOFF_SECONDS * 2 ** excess, MAX_BACKOFF_SECONDS)
+            record["open_until"] = time.time() + backoff
+
+    update_state(apply)
+
+# ==============================
+# Guarded Fetch
+# ==============================
+
+def is_open(source_key):
+    with _lock:
+        return source_record(source_key)["open_until"] > time.time()
+
+
+def guarded_fetch(source_key, fetch):
+    # fetch() must raise on failure, including empty or unusable responses
+    if is_open(source_key):
+        raise CircuitOpenError(f"Circuit open for {source_key}")
+
+    started = time.time()
+
+    try:
+        result = fetch()
+    except Exception as e:
+        record_failure(source_key, e)
+        raise
+
+    record_success(source_key, (time.time() - started) * 1000)
+    return result
+
+
+def order_by_health(items, key):
+    # Closed circuits first, then by success rate and latency
+    def health(item):
+        with _lock:
+            record = source_record(key(item))
+
+        return (
+            record["open_until"] > time.time(),
+            -record["success_rate"],
+            record["avg_latency_ms"] or 0
+        )
+
+    return sorted(items, key=health)
+
+# ==============================
+# CLI
+# ==============================
+
+def print_health():
+    state = load_state()
+
+    if not state:
+        print("No fetch health recorded yet.")
+        return
+
+    now = time.time()
+
+    print(f"{'SOURCE':<40} {'STATE':<10} {'RATE':>6} {'LAT ms':>8} {'FAILS':>6} {'OK':>6} {'ERR':>6}  LAST ERROR")
+
+    for source_key, record in sorted(state.items()):
+        if record["open_until"] > now:
+            status = f"open {int(record['open_until'] - now)}s"
+        elif record["consecutive_failures"] >= FAILURE_THRESHOLD:
+            status = "half-open"
+        else:
+            status = "closed"
+
+        latency = f"{record['avg_latency_ms']:.0f}" if record["avg_latency_ms"] is not None else "-"
+
+        print(
+            f"{source_key[:40]:<40} {status:<10} {record['success_rate']:>6.2f} {latency:>8} "
+            f"{record['consecutive_failures']:>6} {record['successes']:>6} {record['failures']:>6}  "
+            f"{record['last_error'] or ''}"
+        )
+
+
+def main(argv):
+    if not argv:
+        print_health()
+        return 0
+
+    if argv[0] == "reset" and len(argv) == 2:
+        update_state(lambda state: state.pop(argv[1], None))
+        print(f"Reset health for {argv[1]}.")
+        return 0
+
+    print("Usage: python fetch_health.py [reset <source_key>]")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
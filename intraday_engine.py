@@ -1,8 +1,17 @@
 import os
 import requests
 from datetime import datetime, timedelta, timezone
-from supabase import create_client
 from dotenv import load_dotenv
+from reference_cache import load_reference
+from scoring import (
+    article_text,
+    classify_event,
+    merge_signal,
+    new_signal,
+    signal_type_for
+)
+from signal_feed import publish_signal
+from storage import get_storage
 
 # ==============================
 # Load Environment Variables
@@ -10,13 +19,11 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+storage = get_storage()
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("Supabase credentials missing.")
-
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# News for one company fetched within this many minutes of the first
+# headline becomes one composite signal
+SIGNAL_WINDOW_MINUTES = int(os.getenv("SIGNAL_WINDOW_MINUTES", "15"))
 
 # ==============================
 # Telegram Alert Function
@@ -45,43 +52,6 @@ def send_telegram_alert(message):
     except Exception as e:
         print("Telegram error:", e)
 
-# ==============================
-# Keyword Scoring Dictionaries
-# ==============================
-
-HIGH_IMPACT = {
-    "fraud": -60,
-    "scam": -60,
-    "default": -50,
-    "bankruptcy": -70,
-    "investigation": -40,
-    "resignation": -35,
-    "penalty": -30,
-    "downgrade": -25,
-    "crash": -50,
-    "plunge": -40,
-    "acquisition": 50,
-    "buyback": 40,
-    "stake increase": 35,
-    "order win": 30,
-    "major contract": 40,
-    "record profit": 35
-}
-
-MEDIUM_IMPACT = {
-    "growth": 15,
-    "upgrade": 15,
-    "expansion": 20,
-    "guidance raise": 25,
-    "decline": -15,
-    "loss": -20
-}
-
-LOW_IMPACT = {
-    "volatility": 5,
-    "market reaction": 5
-}
-
 # ==============================
 # Fetch Recent Events (12 hours)
 # ==============================
@@ -91,73 +61,135 @@ def fetch_recent_events():
         datetime.now(timezone.utc) - timedelta(hours=12)
     ).isoformat()
 
-    result = (
-        supabase.table("processed_events")
-        .select("id, raw_news_id, company_id, processed_at")
-        .gte("processed_at", twelve_hours_ago)
-        .execute()
-    )
-
-    return result.data or []
+    return storage.fetch_recent_events(twelve_hours_ago)
 
 # ==============================
-# Fetch Article Text
+# Fetch Article
 # ==============================
 
-def fetch_article_text(raw_news_id):
-    result = (
-        supabase.table("raw_news")
-        .select("title, content")
-        .eq("id", raw_news_id)
-        .single()
-        .execute()
+def fetch_article(raw_news_id):
+    return storage.fetch_article(raw_news_id)
+
+
+def parse_time(value):
+    if not value:
+        return None
+
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+    # news_ingestion writes fetched_at as naive UTC
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+
+    return parsed.astimezone(timezone.utc)
+
+
+def article_time(article):
+    # Windows follow article fetch time, as replay.py does, so a run that
+    # works through a backlog never merges news fetched hours apart
+    return parse_time(article.get("fetched_at")) or datetime.now(timezone.utc)
+
+
+def load_source_names():
+    entry = load_reference(
+        storage,
+        "news_sources",
+        "names",
+        storage.fetch_news_sources,
+        derive=lambda rows: {row["id"]: row["name"] for row in rows}
     )
+    return entry["derived"]
 
-    data = result.data or {}
-    return f"{data.get('title','')} {data.get('content','')}".lower()
+# ==============================
+# Prevent Duplicate Signals
+# ==============================
+
+def signal_exists(raw_news_id):
+    return storage.signal_exists(raw_news_id)
 
 # ==============================
-# Classify Event
+# Aggregation Window
 # ==============================
 
-def classify_event(text):
-    score = 0
+def window_contains(signal, at):
+    window_ends_at = parse_time(signal["window_ends_at"])
+    return window_ends_at - timedelta(minutes=SIGNAL_WINDOW_MINUTES) <= at < window_ends_at
 
-    for keyword, weight in HIGH_IMPACT.items():
-        if keyword in text:
-            score += weight
 
-    for keyword, weight in MEDIUM_IMPACT.items():
-        if keyword in text:
-            score += weight
+def fetch_open_signal(company_id, at):
+    latest_end = at + timedelta(minutes=SIGNAL_WINDOW_MINUTES)
+    return storage.fetch_open_signal(company_id, at.isoformat(), latest_end.isoformat())
 
-    for keyword, weight in LOW_IMPACT.items():
-        if keyword in text:
-            score += weight
 
-    if score >= 40:
-        severity = "HIGH"
-    elif abs(score) >= 20:
-        severity = "MEDIUM"
-    elif abs(score) > 0:
-        severity = "LOW"
-    else:
-        severity = None
+def open_signal(company_id, raw_news_id, signal_type, severity, score, headline, source, window_start):
+    signal = new_signal(company_id, raw_news_id, signal_type, severity, score, headline, source)
+    signal["window_ends_at"] = (
+        window_start + timedelta(minutes=SIGNAL_WINDOW_MINUTES)
+    ).isoformat()
+
+    return signal
+
+
+def insert_signal(signal):
+    now = datetime.now(timezone.utc)
+
+    signal["generated_at"] = now.isoformat()
+    signal["updated_at"] = now.isoformat()
+
+    return storage.insert_signal(signal)
+
+
+def update_signal(signal_id, updates):
+    updates["updated_at"] = datetime.now(timezone.utc).isoformat()
+
+    storage.update_signal(signal_id, updates)
 
-    return severity, score
+
+def save_signals(created, updated):
+    # One write per signal touched this run, however many headlines it absorbed
+    for signal in created:
+        signal.update(insert_signal(signal))
+
+    for signal_id, (signal, updates) in updated.items():
+        update_signal(signal_id, updates)
+        signal.update(updates)
 
 # ==============================
-# Prevent Duplicate Signals
+# Alert Formatting
 # ==============================
 
-def signal_exists(raw_news_id):
-    result = (
-        supabase.table("signals")
-        .select("id")
-        .eq("raw_news_id", raw_news_id)
-        .execute()
-    )
-    return bool(result.data)
+def fetch_company_name(company_id):
+    return storage.fetch_company_name(company_id)
+
+
+def format_alert(signal, company_name, previous=None):
+    if previous:
+        if previous["signal_type"] != signal["signal_type"]:
+            heading = f"🔁 *{previous['signal_type']} → {signal['signal_type']} SIGNAL UPDATE*"
+        else:
+            heading = f"🔁 *{signal['signal_type']} SIGNAL UPDATE*"
+
+        if previous["severity"] != signal["severity"]:
+            severity = f"{previous['severity']} → {signal['severity']}"
+        else:
+            severity = signal["severity"]
+    else:
+        heading = f"🚨 *{signal['signal_type']} SIGNAL*"
+        severity = signal["severity"]
+
+    message = f"""
+{heading}
+Company: *{company_name}*
+Severity: *{severity}*
+Score: *{signal['signal_score']}*
+"""
+
+    if signal["headline_count"] > 1:
+        message += f"Headlines: *{signal['headline_count']}* from {', '.join(signal['sources']) or 'unknown sources'}\n"
+
+    message += f"\n📰 {signal['headlines'][-1]}\n"
+
+    return message
 
 # ==============================
 # Generate Signals
@@ -169,14 +201,39 @@ def generate_intraday_signals():
     events = fetch_recent_events()
     print(f"Found {len(events)} recent events.")
 
+    events.sort(key=lambda e: (str(e.get("processed_at") or ""), e["id"]))
+
+    # Oldest article first, the order replay.py uses. Time only moves forward,
+    # so a window the run has left is never needed again and signals can be
+    # held in memory until the end.
+    pending = []
+
     for event in events:
+        if signal_exists(event["raw_news_id"]):
+            continue
+
+        article = fetch_article(event["raw_news_id"])
+        pending.append((article_time(article), event, article))
+
+    pending.sort(key=lambda p: (p[0], p[1]["raw_news_id"]))
+
+    source_names = load_source_names()
+    open_signals = {}
+
+    created = []
+    updated = {}
+    alerts = []
+    folded = set()
+
+    for at, event, article in pending:
         raw_news_id = event["raw_news_id"]
         company_id = event["company_id"]
 
-        if signal_exists(raw_news_id):
+        # An article tagged with several companies feeds only one signal
+        if raw_news_id in folded:
             continue
 
-        text = fetch_article_text(raw_news_id)
+        text = article_text(article.get("title", ""), article.get("content", ""))
         severity, score = classify_event(text)
 
         print(f"DEBUG → Score: {score}, Severity: {severity}")
@@ -184,43 +241,61 @@ def generate_intraday_signals():
         if not severity:
             continue
 
-        if score >= 10:
-            signal_type = "BUY"
-        elif score <= -10:
-            signal_type = "SELL"
-        else:
+        signal_type = signal_type_for(score)
+
+        if not signal_type:
             continue
 
-        # Insert signal
-        supabase.table("signals").insert({
-            "company_id": company_id,
-            "raw_news_id": raw_news_id,
-            "signal_type": signal_type,
-            "severity": severity,
-            "signal_score": score,
-            "generated_at": datetime.now(timezone.utc).isoformat(),
-            "is_active": True
-        }).execute()
-
-        # Fetch metadata
-        company = supabase.table("companies").select("name").eq("id", company_id).single().execute()
-        news = supabase.table("raw_news").select("title").eq("id", raw_news_id).single().execute()
-
-        company_name = company.data["name"]
-        headline = news.data["title"]
-
-        message = f"""
-🚨 *{signal_type} SIGNAL*
-Company: *{company_name}*
-Severity: *{severity}*
-Score: *{score}*
+        folded.add(raw_news_id)
 
-📰 {headline}
-"""
+        headline = article.get("title", "")
+        source = source_names.get(article.get("source_id"))
 
-        send_telegram_alert(message)
+        signal = open_signals.get(company_id)
+
+        if not (signal and window_contains(signal, at)):
+            signal = fetch_open_signal(company_id, at)
+            open_signals[company_id] = signal
+
+        if signal:
+            # Fold into the open composite signal; alert only when its severity
+            # or direction changes
+            previous = {"severity": signal["severity"], "signal_type": signal["signal_type"]}
+
+            updates = merge_signal(signal, raw_news_id, score, headline, source)
+            signal.update(updates)
+
+            if "id" in signal:
+                updated.setdefault(signal["id"], (signal, {}))[1].update(updates)
+
+            if all(signal[key] == value for key, value in previous.items()):
+                print(f"Signal for company {company_id} updated ({signal['headline_count']} headlines)")
+                continue
 
-        print(f"{signal_type} signal sent for {company_name}")
+            company_name = fetch_company_name(company_id)
+            alerts.append(format_alert(signal, company_name, previous))
+
+            print(f"{signal['signal_type']} signal update queued for {company_name}")
+            continue
+
+        signal = open_signal(company_id, raw_news_id, signal_type, severity, score, headline, source, at)
+        open_signals[company_id] = signal
+        created.append(signal)
+
+        company_name = fetch_company_name(company_id)
+        alerts.append(format_alert(signal, company_name))
+
+        print(f"{signal_type} signal queued for {company_name}")
+
+    save_signals(created, updated)
+    print(f"Saved {len(created)} new and {len(updated)} updated signals.")
+
+    # Sent only once the signals they describe are stored
+    for signal in created + [signal for signal, _ in updated.values()]:
+        publish_signal(signal)
+
+    for message in alerts:
+        send_telegram_alert(message)
 
     print("Intraday engine completed.")
 
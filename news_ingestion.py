@@ -1,33 +1,25 @@
 import feedparser
 import hashlib
-import os
+import requests
+import sys
 from datetime import datetime
-from supabase import create_client
-from dotenv import load_dotenv
+from fetch_health import CircuitOpenError, guarded_fetch, order_by_health
+from poll_scheduler import POLL_TICK_SECONDS, due_sources, mark_polled
+from reference_cache import load_reference
+from storage import get_storage
 
 # ==============================
-# Load Environment Variables
+# Storage Backend
 # ==============================
 
-load_dotenv()
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+storage = get_storage()
 
 # ==============================
 # Fetch Active RSS Sources
 # ==============================
 
-def fetch_rss_sources():
-    result = supabase.table("news_sources") \
-        .select("id,name,base_url") \
-        .eq("type", "RSS") \
-        .eq("is_active", True) \
-        .execute()
-
-    return result.data
+def load_rss_sources():
+    return load_reference(storage, "news_sources", "active_rss", storage.fetch_rss_sources)["rows"]
 
 
 # ==============================
@@ -46,16 +38,8 @@ def generate_hash(title, url):
 def insert_article(source_id, title, content, url, published_at):
     hash_signature = generate_hash(title, url)
 
-    # Check duplicate
-    existing = supabase.table("raw_news") \
-        .select("id") \
-        .eq("hash_signature", hash_signature) \
-        .execute()
-
-    if existing.data:
-        return False  # Already exists
-
-    supabase.table("raw_news").insert({
+    # False when an article with this hash already exists
+    return storage.insert_news_if_new({
         "source_id": source_id,
         "title": title,
         "content": content,
@@ -64,9 +48,32 @@ def insert_article(source_id, title, content, url, published_at):
         "fetched_at": datetime.utcnow().isoformat(),
         "is_processed": False,
         "hash_signature": hash_signature
-    }).execute()
+    })
+
+
+# ==============================
+# Fetch RSS Feed
+# ==============================
+
+FEED_TIMEOUT_SECONDS = 10
 
-    return True
+
+def source_key(source):
+    return f"rss:{source['name']}"
+
+
+def fetch_feed(url):
+    response = requests.get(url, timeout=FEED_TIMEOUT_SECONDS)
+
+    if response.status_code != 200:
+        raise Exception(f"Feed returned {response.status_code}")
+
+    feed = feedparser.parse(response.content)
+
+    if feed.bozo and not feed.entries:
+        raise Exception(f"Unparseable feed: {feed.bozo_exception}")
+
+    return feed
 
 
 # ==============================
@@ -76,7 +83,14 @@ def insert_article(source_id, title, content, url, published_at):
 def ingest_feed(source):
     print(f"Ingesting from {source['name']}...")
 
-    feed = feedparser.parse(source["base_url"])
+    try:
+        feed = guarded_fetch(source_key(source), lambda: fetch_feed(source["base_url"]))
+    except CircuitOpenError:
+        print(f"⚠ Skipping {source['name']}: circuit open")
+        return 0
+    except Exception as e:
+        print(f"⚠ Failed to fetch {source['name']}: {e}")
+        return 0
 
     inserted_count = 0
 
@@ -104,26 +118,36 @@ def ingest_feed(source):
             inserted_count += 1
 
     print(f"Inserted {inserted_count} new articles from {source['name']}.")
+    return inserted_count
 
 
 # ==============================
 # Main
 # ==============================
 
-def main():
+def main(argv):
     print("Starting RSS news ingestion...")
 
-    sources = fetch_rss_sources()
+    sources = load_rss_sources()
 
     if not sources:
         print("No active RSS sources found.")
         return
 
-    for source in sources:
-        ingest_feed(source)
+    # --due: only sources the adaptive scheduler says are due this tick
+    if "--due" in argv:
+        sources = due_sources(storage, sources, POLL_TICK_SECONDS)
+        print(f"{len(sources)} sources due for polling.")
+
+    # Healthy sources first so a sick one cannot delay the rest
+    inserted = 0
+    for source in order_by_health(sources, source_key):
+        inserted += ingest_feed(source)
+
+    mark_polled([s["id"] for s in sources], inserted)
 
     print("News ingestion completed successfully.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sys.argv[1:])
\ No newline at end of file
@@ -1,149 +1,112 @@
 import os
+import socket
+import sentiment_model
 from datetime import datetime
-from supabase import create_client
-from dotenv import load_dotenv
+from reference_cache import load_reference
+from scoring import article_text, build_company_matcher, score_article
+from storage import get_storage
 
 # ==============================
-# Load Environment Variables
+# Storage Backend
 # ==============================
 
-load_dotenv()
+storage = get_storage()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+CLAIM_BATCH_SIZE = int(os.getenv("CLAIM_BATCH_SIZE", "200"))
+CLAIM_LEASE_SECONDS = int(os.getenv("CLAIM_LEASE_SECONDS", "300"))
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# keywords: substring rules; linear: batched hashed-feature model
+SENTIMENT_MODE = os.getenv("SENTIMENT_MODE", "keywords")
 
 # ==============================
-# Keyword Rules (Phase 1)
+# Claim Unprocessed News
 # ==============================
 
-POSITIVE_KEYWORDS = ["profit", "growth", "surge", "rally", "beat", "upgrade"]
-NEGATIVE_KEYWORDS = ["loss", "fall", "decline", "drop", "downgrade", "miss"]
+def claim_news_batch():
+    return storage.claim_news_batch(WORKER_ID, CLAIM_BATCH_SIZE, CLAIM_LEASE_SECONDS)
 
-# ==============================
-# Fetch Unprocessed News
-# ==============================
 
-def fetch_unprocessed_news():
-    result = (
-        supabase.table("raw_news")
-        .select("*")
-        .eq("is_processed", False)
-        .execute()
-    )
-    return result.data
+def complete_news_batch(article_ids, events):
+    return storage.complete_news_batch(WORKER_ID, article_ids, events)
 
 # ==============================
-# Fetch Companies
+# Company Matcher
 # ==============================
 
-def fetch_companies():
-    result = (
-        supabase.table("companies")
-        .select("id,name,symbol")
-        .eq("exchange", "NSE")
-        .execute()
+def load_company_matcher():
+    entry = load_reference(
+        storage,
+        "companies",
+        "nse_matcher",
+        storage.fetch_companies,
+        derive=build_company_matcher
     )
-    return result.data
+    return entry["derived"]
 
 # ==============================
-# Sentiment Scoring
+# Batch Sentiment
 # ==============================
 
-def analyze_sentiment(text):
-    text_lower = text.lower()
-
-    positive_hits = sum(word in text_lower for word in POSITIVE_KEYWORDS)
-    negative_hits = sum(word in text_lower for word in NEGATIVE_KEYWORDS)
+def load_sentiment_model():
+    if SENTIMENT_MODE not in ("keywords", "linear"):
+        raise Exception(f"Unknown SENTIMENT_MODE: {SENTIMENT_MODE}")
 
-    if positive_hits > negative_hits:
-        return "bullish", positive_hits
-    elif negative_hits > positive_hits:
-        return "bearish", negative_hits
-    else:
-        return "neutral", 0
+    if SENTIMENT_MODE != "linear":
+        return None
 
-# ==============================
-# Company Detection
-# ==============================
+    return sentiment_model.load_model()
 
-def detect_company(text, companies):
-    for company in companies:
-        name = company["name"].lower()
-        symbol = company["symbol"].lower()
 
-        if name in text or symbol in text:
-            return company["id"]
+def batch_sentiments(articles, model):
+    if model is None:
+        return [None] * len(articles)
 
-    return None
+    texts = [article_text(a.get("title", ""), a.get("content", "")) for a in articles]
+    return sentiment_model.predict(model, texts)
 
 # ==============================
-# Extract Keywords
+# Process News
 # ==============================
 
-def extract_keywords(text):
-    text_lower = text.lower()
-    detected = []
+def process_news():
+    print(f"Starting news processing as worker {WORKER_ID}...")
 
-    for word in POSITIVE_KEYWORDS + NEGATIVE_KEYWORDS:
-        if word in text_lower:
-            detected.append(word)
+    matcher = load_company_matcher()
+    model = load_sentiment_model()
+    total = 0
 
-    return detected
+    while True:
+        news_items = claim_news_batch()
 
-# ==============================
-# Process News
-# ==============================
+        if not news_items:
+            break
 
-def process_news():
-    print("Starting news processing...")
+        print(f"Claimed {len(news_items)} unprocessed articles.")
 
-    news_items = fetch_unprocessed_news()
-    companies = fetch_companies()
+        # Whole batch is scored in one matrix operation in linear mode
+        sentiments = batch_sentiments(news_items, model)
 
-    print(f"Found {len(news_items)} unprocessed articles.")
+        events = []
 
-    for article in news_items:
-        title = article.get("title", "")
-        content = article.get("content", "") or ""
+        for article, model_sentiment in zip(news_items, sentiments):
+            event = score_article(article, matcher, model_sentiment)
 
-        combined_text = f"{title} {content}".lower()
+            # Only insert meaningful signals
+            if event:
+                event["processed_at"] = datetime.utcnow().isoformat()
+                events.append(event)
 
-        company_id = detect_company(combined_text, companies)
+        # Events and processed flags are committed together; articles whose
+        # lease was reclaimed by another worker are skipped
+        committed = complete_news_batch([a["id"] for a in news_items], events)
 
-        if company_id:
-            sentiment, score_hits = analyze_sentiment(combined_text)
+        if committed < len(news_items):
+            print(f"⚠ Lease lost on {len(news_items) - committed} articles.")
 
-            # Only insert meaningful signals
-            if score_hits > 0:
-                detected_keywords = extract_keywords(combined_text)
-
-                base_score = score_hits * 10
-                confidence = min(score_hits * 20, 100)
-
-                supabase.table("processed_events").insert({
-                    "raw_news_id": article["id"],
-                    "company_id": company_id,
-                    "detected_keywords": detected_keywords,
-                    "category": "GENERAL",
-                    "base_score": base_score,
-                    "market_cap_boost": 0,
-                    "final_score": base_score,
-                    "sentiment": sentiment,
-                    "confidence_score": confidence,
-                    "processed_at": datetime.utcnow().isoformat()
-                }).execute()
-
-        # Always mark article processed
-        (
-            supabase.table("raw_news")
-            .update({"is_processed": True})
-            .eq("id", article["id"])
-            .execute()
-        )
-
-    print("News processing completed.")
+        total += committed
+
+    print(f"News processing completed. Processed {total} articles.")
 
 if __name__ == "__main__":
     process_news()
\ No newline at end of file
@@ -1,15 +1,45 @@
+import os
 import subprocess
 import sys
+import time
+from poll_scheduler import POLL_TICK_SECONDS, last_insert_at
 
-def run(script):
+# Downstream stages also run this often without new articles, to pick up
+# leftovers such as expired leases or a failed processor run
+CATCHUP_SECONDS = int(os.getenv("PIPELINE_CATCHUP_SECONDS", "300"))
+
+def run(script, *args):
     print(f"Running {script}...")
-    result = subprocess.run([sys.executable, script])
+    result = subprocess.run([sys.executable, script, *args])
     if result.returncode != 0:
         print(f"{script} failed.")
     else:
         print(f"{script} completed.\n")
 
-if __name__ == "__main__":
-    run("news_ingestion.py")
+def run_pipeline(*ingestion_args):
+    run("news_ingestion.py", *ingestion_args)
     run("news_processor.py")
-    run("intraday_engine.py")
\ No newline at end of file
+    run("intraday_engine.py")
+
+def run_loop():
+    # Adaptive mode: each tick only polls the sources the scheduler marks due
+    last_downstream = 0
+
+    while True:
+        started = time.time()
+        run("news_ingestion.py", "--due")
+
+        # Most ticks insert nothing; skip the processor and the engine's
+        # 12-hour rescan unless there is new news or a catch-up is due
+        if last_insert_at() >= started or started - last_downstream >= CATCHUP_SECONDS:
+            last_downstream = started
+            run("news_processor.py")
+            run("intraday_engine.py")
+
+        time.sleep(max(POLL_TICK_SECONDS - (time.time() - started), 0))
+
+if __name__ == "__main__":
+    if "--loop" in sys.argv[1:]:
+        run_loop()
+    else:
+        run_pipeline()
\ No newline at end of file
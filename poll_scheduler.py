@@ -0,0 +1,256 @@
+import json
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from storage import get_storage
+
+# ==============================
+# Adaptive Polling Scheduler
+# ==============================
+# Each source's publish rate is learned per market phase from
+# raw_news.published_at. For Poisson arrivals polled every T seconds the
+# expected news-to-ingest latency is T/2, so minimising total latency for
+# a fixed number of polls gives T proportional to 1/sqrt(rate).
+
+POLL_STATE_PATH = os.getenv("POLL_STATE_PATH", ".cache/poll_state.json")
+POLL_TICK_SECONDS = int(os.getenv("POLL_TICK_SECONDS", "30"))
+POLL_BUDGET_PER_HOUR = float(os.getenv("POLL_BUDGET_PER_HOUR", "600"))
+POLL_HISTORY_DAYS = int(os.getenv("POLL_HISTORY_DAYS", "14"))
+POLL_RATE_REFRESH_SECONDS = int(os.getenv("POLL_RATE_REFRESH", "3600"))
+MIN_POLL_INTERVAL_SECONDS = int(os.getenv("MIN_POLL_INTERVAL", "60"))
+MAX_POLL_INTERVAL_SECONDS = int(os.getenv("MAX_POLL_INTERVAL", "21600"))
+
+# Keeps silent or new sources on the schedule
+MIN_RATE_PER_HOUR = 0.05
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Share of the hourly request budget spent in each phase
+PHASE_BUDGET_SHARE = {
+    "pre_open": 1.0,
+    "market": 1.0,
+    "off_hours": 0.35,
+    "weekend": 0.15
+}
+
+# Hours each phase covers in a week (NSE holidays are not modelled)
+PHASE_HOURS_PER_WEEK = {
+    "pre_open": 0.25 * 5,
+    "market": 6.25 * 5,
+    "off_hours": 17.5 * 5,
+    "weekend": 48.0
+}
+
+# ==============================
+# Market Phases
+# ==============================
+
+def market_phase(moment):
+    local = moment.astimezone(IST)
+
+    if local.weekday() >= 5:
+        return "weekend"
+
+    minutes = local.hour * 60 + local.minute
+
+    if 9 * 60 <= minutes < 9 * 60 + 15:
+        return "pre_open"
+    if 9 * 60 + 15 <= minutes < 15 * 60 + 30:
+        return "market"
+
+    return "off_hours"
+
+
+def parse_time(value):
+    if not value:
+        return None
+
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+    # feedparser timestamps are stored as naive UTC
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+
+    return parsed
+
+# ==============================
+# Rate Learning
+# ==============================
+
+def learn_rates(history, days):
+    weeks = days / 7
+    counts = {}
+
+    for row in history:
+        published = parse_time(row.get("published_at"))
+
+        if published is None or row.get("source_id") is None:
+            continue
+
+        phase_counts = counts.setdefault(str(row["source_id"]), {})
+        phase = market_phase(published)
+        phase_counts[phase] = phase_counts.get(phase, 0) + 1
+
+    return {
+        source_id: {
+            phase: phase_counts.get(phase, 0) / (hours * weeks)
+            for phase, hours in PHASE_HOURS_PER_WEEK.items()
+        }
+        for source_id, phase_counts in counts.items()
+    }
+
+
+def poll_intervals(source_ids, rates, phase):
+    budget = POLL_BUDGET_PER_HOUR * PHASE_BUDGET_SHARE[phase]
+    max_polls_per_hour = 3600 / MIN_POLL_INTERVAL_SECONDS
+
+    weights = {
+        source_id: math.sqrt(max(rates.get(source_id, {}).get(phase, 0), MIN_RATE_PER_HOUR))
+        for source_id in source_ids
+    }
+
+    # Sources capped at the minimum interval hand their unused share of the
+    # budget back to the others
+    polls = {}
+    remaining = dict(weights)
+
+    while remaining:
+        total = sum(remaining.values())
+        capped = {
+            source_id for source_id, weight in remaining.items()
+            if budget * weight / total > max_polls_per_hour
+        }
+
+        if not capped:
+            for source_id, weight in remaining.items():
+                polls[source_id] = budget * weight / total
+            break
+
+        for source_id in capped:
+            polls[source_id] = max_polls_per_hour
+            budget -= max_polls_per_hour
+            del remaining[source_id]
+
+    return {
+        source_id: min(3600 / rate if rate > 0 else MAX_POLL_INTERVAL_SECONDS, MAX_POLL_INTERVAL_SECONDS)
+        for source_id, rate in polls.items()
+    }
+
+# ==============================
+# Persistent State
+# ==============================
+
+def load_state():
+    state = {"last_polled": {}, "rates": {}, "rates_at": 0}
+
+    if not os.path.exists(POLL_STATE_PATH):
+        return state
+
+    # A broken file only costs one round of polling and a rate refresh
+    try:
+        with open(POLL_STATE_PATH, encoding="utf-8") as f:
+            state.update(json.load(f))
+    except Exception as e:
+        print(f"⚠ Ignoring unreadable poll state {POLL_STATE_PATH}: {e}")
+
+    return state
+
+
+def save_state(state):
+    directory = os.path.dirname(POLL_STATE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Ingestion and pipeline_runner can save at the same moment
+    tmp_path = f"{POLL_STATE_PATH}.{os.getpid()}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+    os.replace(tmp_path, POLL_STATE_PATH)
+
+
+def refresh_rates(storage, state):
+    if time.time() - state["rates_at"] < POLL_RATE_REFRESH_SECONDS:
+        return
+
+    since = (
+        datetime.now(timezone.utc) - timedelta(days=POLL_HISTORY_DAYS)
+    ).isoformat()
+
+    state["rates"] = learn_rates(storage.fetch_publish_history(since), POLL_HISTORY_DAYS)
+    state["rates_at"] = time.time()
+
+# ==============================
+# Due Sources
+# ==============================
+
+def due_sources(storage, sources, tick_seconds):
+    state = load_state()
+    refresh_rates(storage, state)
+
+    now = time.time()
+    phase = market_phase(datetime.now(timezone.utc))
+    intervals = poll_intervals([str(s["id"]) for s in sources], state["rates"], phase)
+
+    overdue = []
+
+    for source in sources:
+        source_id = str(source["id"])
+        elapsed = now - state["last_polled"].get(source_id, 0)
+
+        if elapsed >= intervals[source_id]:
+            overdue.append((elapsed / intervals[source_id], source))
+
+    # Never spend more than the tick's share of the budget; most overdue first
+    limit = math.ceil(POLL_BUDGET_PER_HOUR * PHASE_BUDGET_SHARE[phase] * tick_seconds / 3600)
+    overdue.sort(key=lambda item: item[0], reverse=True)
+
+    save_state(state)
+
+    return [source for _, source in overdue[:limit]]
+
+
+def mark_polled(source_ids, inserted=0):
+    state = load_state()
+    now = time.time()
+
+    for source_id in source_ids:
+        state["last_polled"][str(source_id)] = now
+
+    # pipeline_runner only runs the downstream stages after new articles
+    if inserted:
+        state["last_insert_at"] = now
+
+    save_state(state)
+
+
+def last_insert_at():
+    return load_state().get("last_insert_at", 0)
+
+# ==============================
+# CLI
+# ==============================
+
+def main():
+    storage = get_storage()
+    sources = storage.fetch_rss_sources()
+
+    state = load_state()
+    refresh_rates(storage, state)
+    save_state(state)
+
+    phase = market_phase(datetime.now(timezone.utc))
+    intervals = poll_intervals([str(s["id"]) for s in sources], state["rates"], phase)
+
+    print(f"Phase: {phase} (budget {POLL_BUDGET_PER_HOUR * PHASE_BUDGET_SHARE[phase]:.0f} polls/hour)")
+    print(f"{'SOURCE':<40} {'RATE/h':>8} {'INTERVAL':>10}")
+
+    for source in sorted(sources, key=lambda s: intervals[str(s["id"])]):
+        rate = state["rates"].get(str(source["id"]), {}).get(phase, 0)
+        print(f"{source['name'][:40]:<40} {rate:>8.2f} {intervals[str(source['id'])]:>9.0f}s")
+
+
+if __name__ == "__main__":
+    main()
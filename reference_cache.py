@@ -0,0 +1,130 @@
+import glob
+import os
+import pickle
+import sys
+import time
+import zlib
+
+# ==============================
+# Cache Settings
+# ==============================
+
+CACHE_DIR = os.getenv("REFERENCE_CACHE_DIR", ".cache/reference")
+CACHE_TTL_SECONDS = int(os.getenv("REFERENCE_CACHE_TTL", "21600"))
+
+# ==============================
+# Version Rows
+# ==============================
+
+def fetch_version(storage, table_name):
+    try:
+        return storage.get_reference_version(table_name)
+    except Exception as e:
+        print(f"⚠ Could not read cache version for {table_name}: {e}")
+        return None
+
+
+def bump_version(storage, table_name):
+    # Incremented in the database, not read-then-set, so two sync jobs
+    # finishing together still end on distinct versions
+    version = storage.bump_reference_version(table_name)
+
+    invalidate(table_name)
+
+    return version
+
+# ==============================
+# Local Cache Files
+# ==============================
+
+def cache_path(scope, table_name, key):
+    # Scoped per backend so ids cached from one database never serve another
+    return os.path.join(CACHE_DIR, scope, f"{table_name}.{key}.bin")
+
+
+def read_entry(scope, table_name, key):
+    path = cache_path(scope, table_name, key)
+
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            return pickle.loads(zlib.decompress(f.read()))
+    except Exception as e:
+        print(f"⚠ Ignoring unreadable cache file {path}: {e}")
+        return None
+
+
+def write_entry(scope, table_name, key, entry):
+    path = cache_path(scope, table_name, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+
+    payload = zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+
+    # Atomic swap so concurrent readers never see a partial file
+    os.replace(tmp_path, path)
+
+
+def invalidate(table_name):
+    for path in glob.glob(os.path.join(CACHE_DIR, "*", f"{table_name}.*.bin")):
+        os.remove(path)
+
+# ==============================
+# Read-Through Lookup
+# ==============================
+
+# Served from the local cache while within TTL and matching the version row
+def load_reference(storage, table_name, key, fetch, derive=None):
+    version = fetch_version(storage, table_name)
+    entry = read_entry(storage.cache_scope, table_name, key)
+
+    if entry:
+        fresh = time.time() - entry["cached_at"] < CACHE_TTL_SECONDS
+        current = version is None or entry["version"] == version
+
+        if fresh and current:
+            return entry
+
+    rows = fetch()
+
+    entry = {
+        "version": version or 0,
+        "cached_at": time.time(),
+        "rows": rows,
+        "derived": derive(rows) if derive else None
+    }
+
+    write_entry(storage.cache_scope, table_name, key, entry)
+
+    return entry
+
+# ==============================
+# CLI
+# ==============================
+
+def main(argv):
+    if len(argv) != 2 or argv[0] not in ("bump", "clear"):
+        print("Usage: python reference_cache.py bump|clear <table_name>")
+        return 1
+
+    command, table_name = argv
+
+    if command == "clear":
+        invalidate(table_name)
+        print(f"Cleared local cache for {table_name}.")
+        return 0
+
+    from storage import get_storage
+
+    version = bump_version(get_storage(), table_name)
+    print(f"{table_name} cache version bumped to {version}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,345 @@
+import argparse
+import bisect
+import gzip
+import json
+import os
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import sentiment_model
+from archive import iter_archived_rows
+from scoring import (
+    article_text,
+    build_company_matcher,
+    classify_event,
+    merge_signal,
+    new_signal,
+    score_article,
+    signal_type_for
+)
+
+# ==============================
+# Offline Replay / Backtest
+# ==============================
+# Re-runs the news_processor and intraday_engine rules over table dumps
+# entirely in memory, without touching Supabase.
+
+DEFAULT_HORIZONS = "15m,1h,1d"
+DEFAULT_WINDOW_MINUTES = 15
+
+# ==============================
+# Dump Loading
+# ==============================
+
+def iter_rows(path):
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise Exception("Reading Parquet dumps requires pyarrow (pip install -r requirements-optional.txt)")
+
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+        return
+
+    opener = gzip.open if path.endswith(".gz") else open
+
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_table(path, table, archive_dir):
+    if not archive_dir:
+        yield from iter_rows(path)
+        return
+
+    # A row archived after the dump was taken appears in both. Only ids from
+    # the hot dump are held in memory; it covers the retention window, not
+    # the whole history, so the set stays small however long the archive is.
+    hot_ids = {row.get("id") for row in iter_rows(path)}
+    hot_ids.discard(None)
+
+    # Archived rows come first since they are always older than the hot dump
+    for row in iter_archived_rows(table, archive_dir):
+        if row.get("id") not in hot_ids:
+            yield row
+
+    yield from iter_rows(path)
+
+
+def parse_time(value):
+    if not value:
+        return None
+
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+    # Naive timestamps are written with utcnow() by the live pipeline
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+
+    return parsed
+
+
+def parse_horizon(spec):
+    units = {"m": "minutes", "h": "hours", "d": "days"}
+    return timedelta(**{units[spec[-1]]: int(spec[:-1])})
+
+# ==============================
+# Price Index
+# ==============================
+
+def build_price_index(rows, time_field):
+    series = defaultdict(list)
+
+    for row in rows:
+        ts = parse_time(row.get(time_field))
+        price = row.get("price")
+
+        if ts is None or price is None:
+            continue
+
+        series[row["company_id"]].append((ts, float(price)))
+
+    # A quiet stock's last change can be long before the dump ends, so
+    # prices are known up to the newest quote of any company
+    until = max((ts for points in series.values() for ts, _ in points), default=None)
+    index = {}
+
+    for company_id, points in series.items():
+        points.sort(key=lambda p: p[0])
+        index[company_id] = ([p[0] for p in points], [p[1] for p in points], until)
+
+    return index
+
+
+def price_as_of(index, company_id, ts):
+    # prices only holds quotes that changed, so the price at ts is the last
+    # quote at or before it. Outside the dump's range it is unknown.
+    if company_id not in index:
+        return None
+
+    times, prices, until = index[company_id]
+
+    if ts < times[0] or ts > until:
+        return None
+
+    return prices[bisect.bisect_right(times, ts) - 1]
+
+# ==============================
+# Replay Core
+# ==============================
+
+def article_time(article, time_field):
+    return parse_time(article.get(time_field) or article.get("published_at"))
+
+
+def replay_order(time_field):
+    # Oldest first with id as tie-break, as intraday_engine walks a run;
+    # undated articles go last
+    def key(article):
+        ts = article_time(article, time_field)
+        return (ts is None, ts or datetime.min.replace(tzinfo=timezone.utc), article.get("id") or 0)
+
+    return key
+
+
+def replay_batch(articles, matcher, time_field, source_names, open_signals, window, model=None):
+    opened = []
+
+    # Windows open on the earliest headline, so input order must not matter
+    articles = sorted(articles, key=replay_order(time_field))
+
+    if model:
+        texts = [article_text(a.get("title", ""), a.get("content", "")) for a in articles]
+        sentiments = sentiment_model.predict(model, texts)
+    else:
+        sentiments = [None] * len(articles)
+
+    for article, model_sentiment in zip(articles, sentiments):
+        # news_processor stage
+        event = score_article(article, matcher, model_sentiment)
+
+        if not event:
+            continue
+
+        # intraday_engine stage
+        text = article_text(article.get("title", ""), article.get("content", ""))
+        severity, score = classify_event(text)
+
+        if not severity:
+            continue
+
+        signal_type = signal_type_for(score)
+
+        if not signal_type:
+            continue
+
+        company_id = event["company_id"]
+        headline = article.get("title", "")
+        source = source_names.get(article.get("source_id"), article.get("source_id"))
+        ts = article_time(article, time_field)
+
+        # Same aggregation window as intraday_engine: article time, not run time
+        signal = open_signals.get(company_id)
+
+        if (
+            signal and ts and signal["window_ends_at"]
+            and signal["window_ends_at"] - window <= ts < signal["window_ends_at"]
+        ):
+            signal.update(merge_signal(signal, article["id"], score, headline, source))
+            continue
+
+        signal = new_signal(company_id, article["id"], signal_type, severity, score, headline, source)
+        signal["sentiment"] = event["sentiment"]
+        signal["confidence_score"] = event["confidence_score"]
+        signal["generated_at"] = ts
+        signal["window_ends_at"] = ts + window if ts else None
+
+        open_signals[company_id] = signal
+        opened.append(signal)
+
+    return opened
+
+
+def attach_outcomes(signal, price_index, horizons):
+    ts = signal["generated_at"]
+    entry = price_as_of(price_index, signal["company_id"], ts) if ts else None
+
+    outcomes = {}
+
+    for label, delta in horizons.items():
+        exit_price = price_as_of(price_index, signal["company_id"], ts + delta) if entry else None
+
+        if not entry or exit_price is None:
+            outcomes[label] = None
+            continue
+
+        forward_return = (exit_price - entry) / entry * 100
+        direction = 1 if signal["signal_type"] == "BUY" else -1
+
+        outcomes[label] = {
+            "return_pct": round(forward_return, 4),
+            "hit": forward_return * direction > 0
+        }
+
+    signal["entry_price"] = entry
+    signal["outcomes"] = outcomes
+
+# ==============================
+# Outcome Stats
+# ==============================
+
+def summarize(signals, horizon_labels):
+    by_severity = defaultdict(list)
+
+    for signal in signals:
+        by_severity[signal["severity"]].append(signal)
+        by_severity["ALL"].append(signal)
+
+    stats = {}
+
+    for severity, group in by_severity.items():
+        entry = {"signals": len(group), "horizons": {}}
+
+        for label in horizon_labels:
+            results = [s["outcomes"][label] for s in group if s["outcomes"].get(label)]
+            returns = [r["return_pct"] for r in results]
+
+            entry["horizons"][label] = {
+                "evaluated": len(results),
+                "hit_rate": round(sum(r["hit"] for r in results) / len(results), 4) if results else None,
+                "avg_return_pct": round(statistics.fmean(returns), 4) if returns else None,
+                "median_return_pct": round(statistics.median(returns), 4) if returns else None
+            }
+
+        stats[severity] = entry
+
+    return stats
+
+# ==============================
+# Main
+# ==============================
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay scoring rules over table dumps.")
+    parser.add_argument("--raw-news", required=True, help="raw_news dump (.jsonl, .jsonl.gz or .parquet)")
+    parser.add_argument("--companies", required=True, help="companies dump")
+    parser.add_argument("--prices", help="prices dump, needed for outcome stats; a price at time t is the "
+                        "last quote at or before t, since only changed quotes are stored")
+    parser.add_argument("--news-sources", help="news_sources dump, used for source names")
+    parser.add_argument("--out-dir", default="replay_output")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--time-field", default="fetched_at", help="raw_news field used as signal time")
+    parser.add_argument("--price-time-field", default="created_at")
+    parser.add_argument("--horizons", default=DEFAULT_HORIZONS)
+    parser.add_argument("--window-minutes", type=int, default=DEFAULT_WINDOW_MINUTES,
+                        help="aggregation window, matching SIGNAL_WINDOW_MINUTES")
+    parser.add_argument("--sentiment-model", help="score with this linear model, as SENTIMENT_MODE=linear does")
+    parser.add_argument("--archive-dir", help="also read archived raw_news/prices rows from this archive")
+    args = parser.parse_args()
+
+    started = time.time()
+
+    companies = [c for c in iter_rows(args.companies) if c.get("exchange", "NSE") == "NSE"]
+    matcher = build_company_matcher(companies)
+    print(f"Loaded {len(companies)} NSE companies.")
+
+    horizons = {label: parse_horizon(label) for label in args.horizons.split(",")}
+
+    price_index = {}
+    if args.prices:
+        price_index = build_price_index(iter_table(args.prices, "prices", args.archive_dir), args.price_time_field)
+        print(f"Indexed prices for {len(price_index)} companies.")
+
+    source_names = {}
+    if args.news_sources:
+        source_names = {row["id"]: row["name"] for row in iter_rows(args.news_sources)}
+
+    model = sentiment_model.load_model(args.sentiment_model) if args.sentiment_model else None
+
+    window = timedelta(minutes=args.window_minutes)
+    open_signals = {}
+
+    # Dumps and archives are not guaranteed to be in time order, and a window
+    # can span any two batches, so the whole set is sorted before replay
+    articles = sorted(iter_table(args.raw_news, "raw_news", args.archive_dir), key=replay_order(args.time_field))
+    print(f"Loaded {len(articles)} articles.")
+
+    all_signals = []
+    article_count = 0
+
+    for start in range(0, len(articles), args.batch_size):
+        batch = articles[start:start + args.batch_size]
+        all_signals.extend(replay_batch(batch, matcher, args.time_field, source_names, open_signals, window, model))
+
+        article_count += len(batch)
+        print(f"Replayed {article_count} articles...")
+
+    # Outcomes are measured once composites have absorbed their whole window
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    with open(os.path.join(args.out_dir, "signals.jsonl"), "w", encoding="utf-8") as out:
+        for signal in all_signals:
+            attach_outcomes(signal, price_index, horizons)
+            out.write(json.dumps(signal, default=str) + "\n")
+
+    stats = summarize(all_signals, list(horizons))
+
+    with open(os.path.join(args.out_dir, "stats.json"), "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+
+    elapsed = time.time() - started
+    print(f"Replayed {article_count} articles into {len(all_signals)} signals in {elapsed:.1f}s.")
+    print(f"Results written to {args.out_dir}.")
+
+
+if __name__ == "__main__":
+    main()
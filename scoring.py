@@ -0,0 +1,226 @@
+# ==============================
+# Shared Detection & Scoring Rules
+# ==============================
+# Pure functions used by news_processor, intraday_engine and the offline
+# replay, so every path makes exactly the same decisions.
+
+# ==============================
+# Keyword Rules (Phase 1)
+# ==============================
+
+POSITIVE_KEYWORDS = ["profit", "growth", "surge", "rally", "beat", "upgrade"]
+NEGATIVE_KEYWORDS = ["loss", "fall", "decline", "drop", "downgrade", "miss"]
+
+# ==============================
+# Keyword Scoring Dictionaries
+# ==============================
+
+HIGH_IMPACT = {
+    "fraud": -60,
+    "scam": -60,
+    "default": -50,
+    "bankruptcy": -70,
+    "investigation": -40,
+    "resignation": -35,
+    "penalty": -30,
+    "downgrade": -25,
+    "crash": -50,
+    "plunge": -40,
+    "acquisition": 50,
+    "buyback": 40,
+    "stake increase": 35,
+    "order win": 30,
+    "major contract": 40,
+    "record profit": 35
+}
+
+MEDIUM_IMPACT = {
+    "growth": 15,
+    "upgrade": 15,
+    "expansion": 20,
+    "guidance raise": 25,
+    "decline": -15,
+    "loss": -20
+}
+
+LOW_IMPACT = {
+    "volatility": 5,
+    "market reaction": 5
+}
+
+# ==============================
+# Article Text
+# ==============================
+
+def article_text(title, content):
+    return f"{title} {content or ''}".lower()
+
+# ==============================
+# Sentiment Scoring
+# ==============================
+
+def analyze_sentiment(text):
+    text_lower = text.lower()
+
+    positive_hits = sum(word in text_lower for word in POSITIVE_KEYWORDS)
+    negative_hits = sum(word in text_lower for word in NEGATIVE_KEYWORDS)
+
+    if positive_hits > negative_hits:
+        return "bullish", positive_hits
+    elif negative_hits > positive_hits:
+        return "bearish", negative_hits
+    else:
+        return "neutral", 0
+
+# ==============================
+# Company Detection
+# ==============================
+
+def build_company_matcher(companies):
+    return [
+        (company["name"].lower(), company["symbol"].lower(), company["id"])
+        for company in companies
+    ]
+
+
+def detect_company(text, matcher):
+    for name, symbol, company_id in matcher:
+        if name in text or symbol in text:
+            return company_id
+
+    return None
+
+# ==============================
+# Extract Keywords
+# ==============================
+
+def extract_keywords(text):
+    text_lower = text.lower()
+    detected = []
+
+    for word in POSITIVE_KEYWORDS + NEGATIVE_KEYWORDS:
+        if word in text_lower:
+            detected.append(word)
+
+    return detected
+
+# ==============================
+# Build Processed Event
+# ==============================
+
+def score_article(article, matcher, model_sentiment=None):
+    text = article_text(article.get("title", ""), article.get("content", ""))
+
+    company_id = detect_company(text, matcher)
+
+    if not company_id:
+        return None
+
+    if model_sentiment:
+        # (sentiment, confidence) from the batched linear model; base_score
+        # stays on the keyword scale where confidence is twice the base
+        sentiment, confidence = model_sentiment
+
+        if sentiment == "neutral":
+            return None
+
+        base_score = confidence // 2
+    else:
+        sentiment, score_hits = analyze_sentiment(text)
+
+        # Only meaningful signals become events
+        if score_hits <= 0:
+            return None
+
+        base_score = score_hits * 10
+        confidence = min(score_hits * 20, 100)
+
+    return {
+        "raw_news_id": article["id"],
+        "company_id": company_id,
+        "detected_keywords": extract_keywords(text),
+        "category": "GENERAL",
+        "base_score": base_score,
+        "market_cap_boost": 0,
+        "final_score": base_score,
+        "sentiment": sentiment,
+        "confidence_score": confidence
+    }
+
+# ==============================
+# Classify Event
+# ==============================
+
+def classify_event(text):
+    score = 0
+
+    for keyword, weight in HIGH_IMPACT.items():
+        if keyword in text:
+            score += weight
+
+    for keyword, weight in MEDIUM_IMPACT.items():
+        if keyword in text:
+            score += weight
+
+    for keyword, weight in LOW_IMPACT.items():
+        if keyword in text:
+            score += weight
+
+    return severity_for(score), score
+
+
+def severity_for(score):
+    if score >= 40:
+        return "HIGH"
+    elif abs(score) >= 20:
+        return "MEDIUM"
+    elif abs(score) > 0:
+        return "LOW"
+
+    return None
+
+
+def signal_type_for(score):
+    if score >= 10:
+        return "BUY"
+    elif score <= -10:
+        return "SELL"
+
+    return None
+
+# ==============================
+# Composite Signals
+# ==============================
+
+def new_signal(company_id, raw_news_id, signal_type, severity, score, headline, source):
+    return {
+        "company_id": company_id,
+        "raw_news_id": raw_news_id,
+        "raw_news_ids": [raw_news_id],
+        "signal_type": signal_type,
+        "severity": severity,
+        "signal_score": score,
+        "headline_count": 1,
+        "headlines": [headline],
+        "sources": [source] if source else [],
+        "is_active": True
+    }
+
+
+def merge_signal(signal, raw_news_id, score, headline, source):
+    combined = signal["signal_score"] + score
+
+    sources = list(signal.get("sources") or [])
+    if source and source not in sources:
+        sources.append(source)
+
+    # Offsetting news keeps the composite's direction rather than dropping it
+    return {
+        "raw_news_ids": list(signal.get("raw_news_ids") or []) + [raw_news_id],
+        "signal_type": signal_type_for(combined) or signal["signal_type"],
+        "severity": severity_for(combined) or "LOW",
+        "signal_score": combined,
+        "headline_count": (signal.get("headline_count") or 1) + 1,
+        "headlines": list(signal.get("headlines") or []) + [headline],
+        "sources": sources
+    }
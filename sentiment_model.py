@@ -0,0 +1,243 @@
+import argparse
+import os
+import re
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ==============================
+# Batched Linear Sentiment Model
+# ==============================
+# Articles are tokenised into hashed unigram/bigram features (with simple
+# negation marking) and scored for a whole batch in one sparse product.
+
+# No weights ship with the repo: they are trained from this deployment's own
+# labelled processed_events (see main) and written here
+DEFAULT_MODEL_PATH = "models/sentiment_v1.npz"
+DEFAULT_N_FEATURES = 2 ** 16
+
+CLASSES = ["bearish", "neutral", "bullish"]
+
+NEGATIONS = {"no", "not", "never", "without", "nor", "nil", "zero", "barely"}
+NEGATION_SCOPE = 3
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def require_numpy():
+    if np is None:
+        raise Exception("SENTIMENT_MODE=linear requires numpy (pip install -r requirements-optional.txt)")
+
+# ==============================
+# Feature Hashing
+# ==============================
+
+def tokenize(text):
+    tokens = []
+    negate_left = 0
+
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in NEGATIONS:
+            negate_left = NEGATION_SCOPE
+            tokens.append(token)
+            continue
+
+        # "no loss" becomes not_loss so it can carry its own weight
+        if negate_left:
+            tokens.append(f"not_{token}")
+            negate_left -= 1
+        else:
+            tokens.append(token)
+
+    return tokens
+
+
+def hash_feature(feature, n_features):
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(feature.encode("utf-8")) % n_features
+
+
+def featurize(texts, n_features):
+    # Returns the batch as COO arrays: row index, column index, value
+    rows, cols = [], []
+
+    for i, text in enumerate(texts):
+        tokens = tokenize(text)
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+        for feature in features:
+            rows.append(i)
+            cols.append(hash_feature(feature, n_features))
+
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    data = np.ones(len(cols), dtype=np.float64)
+
+    # L2-normalise each row so long articles do not dominate
+    norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(texts)))
+    data /= np.maximum(norms[rows], 1e-12)
+
+    return rows, cols, data
+
+# ==============================
+# Model File
+# ==============================
+
+def load_model(path=None):
+    require_numpy()
+
+    path = path or os.getenv("SENTIMENT_MODEL_PATH", DEFAULT_MODEL_PATH)
+
+    if not os.path.exists(path):
+        raise Exception(
+            f"Sentiment model not found at {path}. Train one with "
+            f"`python sentiment_model.py --events <processed_events dump> --news <raw_news dump> --out {path}`, "
+            "point SENTIMENT_MODEL_PATH at an existing model, or use SENTIMENT_MODE=keywords."
+        )
+
+    with np.load(path) as f:
+        model = {
+            "weights": f["weights"],
+            "bias": f["bias"],
+            "classes": [str(c) for c in f["classes"]],
+            "version": str(f["version"]),
+            "n_features": int(f["n_features"])
+        }
+
+    print(f"Loaded sentiment model {model['version']} from {path}.")
+    return model
+
+
+def save_model(path, weights, bias, version):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    np.savez_compressed(
+        path,
+        weights=weights.astype(np.float32),
+        bias=bias.astype(np.float32),
+        classes=np.array(CLASSES),
+        version=np.array(version),
+        n_features=np.array(weights.shape[1])
+    )
+
+# ==============================
+# Scoring
+# ==============================
+
+def class_logits(rows, cols, data, weights, bias, n_rows):
+    logits = np.empty((n_rows, len(bias)))
+
+    for k in range(len(bias)):
+        logits[:, k] = np.bincount(rows, weights=weights[k, cols] * data, minlength=n_rows)
+
+    return logits + bias
+
+
+def softmax(logits):
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+def predict(model, texts):
+    # Returns (sentiment, confidence_score) per text
+    if not texts:
+        return []
+
+    rows, cols, data = featurize(texts, model["n_features"])
+    probs = softmax(class_logits(rows, cols, data, model["weights"], model["bias"], len(texts)))
+
+    labels = probs.argmax(axis=1)
+    confidence = np.rint(probs.max(axis=1) * 100).astype(int)
+
+    return [
+        (model["classes"][label], int(score))
+        for label, score in zip(labels, confidence)
+    ]
+
+# ==============================
+# Offline Training
+# ==============================
+
+def load_training_set(events_path, news_path):
+    from replay import iter_rows
+    from scoring import article_text
+
+    labels = {e["raw_news_id"]: e["sentiment"] for e in iter_rows(events_path) if e.get("sentiment")}
+
+    texts, targets = [], []
+
+    for article in iter_rows(news_path):
+        # Processed articles that produced no event are the neutral examples
+        label = labels.get(article["id"])
+        if label is None:
+            if not article.get("is_processed"):
+                continue
+            label = "neutral"
+
+        if label not in CLASSES:
+            continue
+
+        texts.append(article_text(article.get("title", ""), article.get("content", "")))
+        targets.append(CLASSES.index(label))
+
+    return texts, np.asarray(targets, dtype=np.int64)
+
+
+def train(texts, targets, n_features, epochs, learning_rate, l2):
+    n_rows = len(texts)
+    rows, cols, data = featurize(texts, n_features)
+
+    weights = np.zeros((len(CLASSES), n_features))
+    bias = np.zeros(len(CLASSES))
+
+    one_hot = np.zeros((n_rows, len(CLASSES)))
+    one_hot[np.arange(n_rows), targets] = 1.0
+
+    for epoch in range(epochs):
+        probs = softmax(class_logits(rows, cols, data, weights, bias, n_rows))
+        error = (probs - one_hot) / n_rows
+
+        for k in range(len(CLASSES)):
+            gradient = np.bincount(cols, weights=data * error[rows, k], minlength=n_features)
+            weights[k] -= learning_rate * (gradient + l2 * weights[k])
+
+        bias -= learning_rate * error.sum(axis=0)
+
+        if (epoch + 1) % 50 == 0 or epoch == epochs - 1:
+            loss = -np.log(probs[np.arange(n_rows), targets] + 1e-12).mean()
+            accuracy = (probs.argmax(axis=1) == targets).mean()
+            print(f"Epoch {epoch + 1}: loss {loss:.4f}, accuracy {accuracy:.3f}")
+
+    return weights, bias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the linear sentiment model from labelled dumps.")
+    parser.add_argument("--events", required=True, help="processed_events dump with sentiment labels")
+    parser.add_argument("--news", required=True, help="raw_news dump")
+    parser.add_argument("--out", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--version", default="v1")
+    parser.add_argument("--n-features", type=int, default=DEFAULT_N_FEATURES)
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--learning-rate", type=float, default=5.0)
+    parser.add_argument("--l2", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    require_numpy()
+
+    texts, targets = load_training_set(args.events, args.news)
+    print(f"Training on {len(texts)} articles ({np.bincount(targets, minlength=len(CLASSES)).tolist()} per class).")
+
+    weights, bias = train(texts, targets, args.n_features, args.epochs, args.learning_rate, args.l2)
+
+    save_model(args.out, weights, bias, args.version)
+    print(f"Saved sentiment model {args.version} to {args.out}.")
+
+
+if __name__ == "__main__":
+    main()
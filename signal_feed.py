@@ -0,0 +1,299 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+from urllib.request import Request, urlopen
+from dotenv import load_dotenv
+
+# ==============================
+# Live Signal Feed Server
+# ==============================
+# intraday_engine POSTs each new or updated signal to /publish. Subscribers
+# hold an SSE stream on /stream and can resume from a cursor (the last event
+# id they saw) while it is still inside the in-memory ring buffer.
+#
+# Event ids are "<epoch>-<seq>". The epoch changes on every restart, so a
+# client resuming from an earlier process gets a reset event and the whole
+# buffer instead of waiting for seq to catch up with its old cursor.
+
+# ==============================
+# Load Environment Variables
+# ==============================
+
+# Server and publisher must agree on SIGNAL_FEED_TOKEN, wherever it is set
+load_dotenv()
+
+SIGNAL_FEED_URL = os.getenv("SIGNAL_FEED_URL")
+SIGNAL_FEED_HOST = os.getenv("SIGNAL_FEED_HOST", "127.0.0.1")
+SIGNAL_FEED_PORT = int(os.getenv("SIGNAL_FEED_PORT", "8765"))
+SIGNAL_FEED_TOKEN = os.getenv("SIGNAL_FEED_TOKEN")
+SIGNAL_FEED_BUFFER = int(os.getenv("SIGNAL_FEED_BUFFER", "1000"))
+
+SUBSCRIBER_QUEUE_SIZE = 256
+HEARTBEAT_SECONDS = 15
+MAX_BODY_BYTES = 64 * 1024
+
+# ==============================
+# Feed State
+# ==============================
+
+class SignalFeed:
+    def __init__(self, buffer_size):
+        self.buffer = deque(maxlen=buffer_size)
+        self.subscribers = set()
+        self.epoch = f"{int(time.time() * 1000):x}"
+        self.seq = 0
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, signal):
+        self.seq += 1
+        self.published += 1
+
+        data = json.dumps(signal, default=str, separators=(",", ":"))
+        frame = f"id: {self.epoch}-{self.seq}\nevent: signal\ndata: {data}\n\n".encode("utf-8")
+
+        self.buffer.append((self.seq, frame))
+
+        # Fan out without awaiting; a subscriber that cannot keep up is cut
+        # off rather than slowing everyone else down
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait((self.seq, frame))
+            except asyncio.QueueFull:
+                self.subscribers.discard(queue)
+                self.dropped += 1
+
+        return self.seq
+
+    def parse_cursor(self, value):
+        # Returns (seq to resume after, notice for the client)
+        epoch, _, seq = str(value or "0").rpartition("-")
+        seq = int(seq)
+
+        # Cursor from another server process, or ahead of this one
+        if (epoch and epoch != self.epoch) or seq > self.seq:
+            return 0, "reset"
+
+        if seq > 0 and self.buffer and seq < self.buffer[0][0] - 1:
+            return seq, "gap"
+
+        return seq, None
+
+    def subscribe(self, cursor):
+        seq, notice = self.parse_cursor(cursor)
+
+        # Snapshot taken in the same step as registering, so nothing published
+        # in between can be missed or duplicated
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        backlog = [item for item in self.buffer if item[0] > seq]
+
+        return queue, seq, backlog, notice
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def stats(self):
+        return {
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "cursor": f"{self.epoch}-{self.seq}",
+            "buffered": len(self.buffer),
+            "oldest_seq": self.buffer[0][0] if self.buffer else None,
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped_subscribers": self.dropped
+        }
+
+# ==============================
+# HTTP Handling
+# ==============================
+
+async def read_request(reader):
+    request_line = await reader.readline()
+
+    if not request_line:
+        return None
+
+    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    body = b""
+    length = int(headers.get("content-length", "0") or 0)
+
+    if length > MAX_BODY_BYTES:
+        raise ValueError("Request body too large")
+
+    if length:
+        body = await reader.readexactly(length)
+
+    return method, target, headers, body
+
+
+def respond(writer, status, payload):
+    body = json.dumps(payload).encode("utf-8")
+
+    writer.write(
+        f"HTTP/1.1 {status}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n".encode("latin-1") + body
+    )
+
+
+async def stream(feed, writer, cursor):
+    # Parsed before any headers go out, so a bad cursor still gets a 400
+    queue, last_sent, backlog, notice = feed.subscribe(cursor)
+
+    try:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: keep-alive\r\n"
+            b"Access-Control-Allow-Origin: *\r\n\r\n"
+        )
+
+        if notice:
+            writer.write(f"event: {notice}\ndata: {{}}\n\n".encode("utf-8"))
+
+        for seq, frame in backlog:
+            writer.write(frame)
+            last_sent = seq
+
+        await writer.drain()
+
+        # A subscriber dropped for falling behind leaves this loop and is
+        # expected to reconnect with its last seen id
+        while queue in feed.subscribers:
+            try:
+                seq, frame = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                writer.write(b": heartbeat\n\n")
+                await writer.drain()
+                continue
+
+            if seq <= last_sent:
+                continue
+
+            # Drain whatever else is already queued into a single write
+            frames = [frame]
+            last_sent = seq
+
+            while not queue.empty():
+                seq, frame = queue.get_nowait()
+                if seq > last_sent:
+                    frames.append(frame)
+                    last_sent = seq
+
+            writer.write(b"".join(frames))
+            await writer.drain()
+
+    finally:
+        feed.unsubscribe(queue)
+
+
+async def handle_client(feed, reader, writer):
+    try:
+        request = await read_request(reader)
+
+        if request is None:
+            return
+
+        method, target, headers, body = request
+        url = urlsplit(target)
+
+        if method == "GET" and url.path == "/stream":
+            query = parse_qs(url.query)
+            cursor = query.get("cursor", [headers.get("last-event-id", "0")])[0]
+            await stream(feed, writer, cursor)
+
+        elif method == "POST" and url.path == "/publish":
+            if SIGNAL_FEED_TOKEN and headers.get("x-feed-token") != SIGNAL_FEED_TOKEN:
+                respond(writer, "401 Unauthorized", {"error": "invalid token"})
+            else:
+                seq = feed.publish(json.loads(body or b"{}"))
+                respond(writer, "200 OK", {"seq": seq})
+
+        elif method == "GET" and url.path == "/health":
+            respond(writer, "200 OK", feed.stats())
+
+        else:
+            respond(writer, "404 Not Found", {"error": "not found"})
+
+        await writer.drain()
+
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+
+    except Exception as e:
+        print(f"⚠ Feed request error: {e}")
+        try:
+            respond(writer, "400 Bad Request", {"error": str(e)})
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    finally:
+        writer.close()
+
+# ==============================
+# Publisher Client
+# ==============================
+
+def publish_signal(signal, timeout=1):
+    # Used by intraday_engine; a missing or slow feed server never blocks alerts
+    if not SIGNAL_FEED_URL:
+        return
+
+    headers = {"X-Feed-Token": SIGNAL_FEED_TOKEN} if SIGNAL_FEED_TOKEN else {}
+
+    try:
+        request = Request(
+            f"{SIGNAL_FEED_URL.rstrip('/')}/publish",
+            data=json.dumps(signal, default=str).encode("utf-8"),
+            headers={"Content-Type": "application/json", **headers}
+        )
+        urlopen(request, timeout=timeout).close()
+    except Exception as e:
+        print("Signal feed error:", e)
+
+# ==============================
+# Main
+# ==============================
+
+async def serve(host, port, buffer_size):
+    feed = SignalFeed(buffer_size)
+
+    server = await asyncio.start_server(
+        lambda r, w: handle_client(feed, r, w),
+        host,
+        port,
+        backlog=1024
+    )
+
+    print(f"Signal feed listening on http://{host}:{port} (buffer {buffer_size}).")
+
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    try:
+        asyncio.run(serve(SIGNAL_FEED_HOST, SIGNAL_FEED_PORT, SIGNAL_FEED_BUFFER))
+    except KeyboardInterrupt:
+        print("Signal feed stopped.")
+
+
+if __name__ == "__main__":
+    main()
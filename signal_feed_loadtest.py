@@ -0,0 +1,211 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from dotenv import load_dotenv
+
+# ==============================
+# Signal Feed Load Test
+# ==============================
+# Opens N SSE subscribers against a local feed server, publishes M signals
+# stamped with the send time, and reports the fan-out latency seen by every
+# subscriber. Subscribers and publisher share one clock, so run it on the
+# same host as the server.
+
+# Same SIGNAL_FEED_TOKEN as the server it publishes to
+load_dotenv()
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "signal_feed.py")
+
+# ==============================
+# HTTP Helpers
+# ==============================
+
+async def publish(host, port, signal):
+    reader, writer = await asyncio.open_connection(host, port)
+
+    body = json.dumps(signal).encode("utf-8")
+    token = os.getenv("SIGNAL_FEED_TOKEN")
+    auth = f"X-Feed-Token: {token}\r\n" if token else ""
+
+    writer.write(
+        b"POST /publish HTTP/1.1\r\n"
+        + f"Host: {host}\r\n{auth}Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1")
+        + body
+    )
+    await writer.drain()
+
+    response = await reader.read()
+    writer.close()
+
+    if b" 200 " not in response.split(b"\r\n", 1)[0]:
+        raise Exception(f"Publish failed: {response[:80]!r}")
+
+
+async def subscribe(host, port, expected, latencies, ready):
+    reader, writer = await asyncio.open_connection(host, port)
+
+    # Start after whatever is already buffered
+    cursor = await fetch_seq(host, port)
+
+    writer.write(f"GET /stream?cursor={cursor} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+
+    # Response headers
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+
+    ready.release()
+
+    received = 0
+
+    while received < expected:
+        line = await reader.readline()
+
+        if not line:
+            break
+
+        if line.startswith(b"data: "):
+            signal = json.loads(line[6:])
+            if "sent_at" in signal:
+                latencies.append(time.perf_counter() - signal["sent_at"])
+                received += 1
+
+    writer.close()
+    return received
+
+
+async def fetch_seq(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET /health HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+
+    response = await reader.read()
+    writer.close()
+
+    return json.loads(response.split(b"\r\n\r\n", 1)[1])["seq"]
+
+# ==============================
+# Load Test
+# ==============================
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def acquire_all(ready, count):
+    for _ in range(count):
+        await ready.acquire()
+
+
+async def wait_connected(tasks, ready, timeout):
+    # Fails as soon as a subscriber errors, e.g. connection refused, instead
+    # of waiting forever for a release that never comes
+    waiter = asyncio.create_task(acquire_all(ready, len(tasks)))
+    pending = {waiter, *tasks}
+    deadline = time.monotonic() + timeout
+
+    try:
+        while not waiter.done():
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                raise Exception(f"Subscribers not connected after {timeout}s")
+
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                if task is not waiter and task.exception():
+                    raise Exception(f"Subscriber failed: {task.exception()!r}") from task.exception()
+    finally:
+        waiter.cancel()
+
+
+async def run(host, port, subscribers, signals, interval, connect_timeout):
+    latencies = []
+    ready = asyncio.Semaphore(0)
+
+    tasks = [
+        asyncio.create_task(subscribe(host, port, signals, latencies, ready))
+        for _ in range(subscribers)
+    ]
+
+    try:
+        await wait_connected(tasks, ready, connect_timeout)
+    except Exception:
+        # Collect the other subscribers' errors so only the first is reported
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    print(f"{subscribers} subscribers connected; publishing {signals} signals...")
+
+    started = time.perf_counter()
+
+    for i in range(signals):
+        await publish(host, port, {
+            "company_id": i % 500,
+            "signal_type": "BUY" if i % 2 else "SELL",
+            "severity": "HIGH",
+            "sent_at": time.perf_counter()
+        })
+        await asyncio.sleep(interval)
+
+    received = await asyncio.wait_for(asyncio.gather(*tasks), timeout=60)
+    elapsed = time.perf_counter() - started
+
+    delivered = sum(received)
+    expected = subscribers * signals
+
+    print(f"Delivered {delivered}/{expected} events in {elapsed:.2f}s.")
+
+    if latencies:
+        print(
+            "Fan-out latency: "
+            f"p50 {percentile(latencies, 50) * 1000:.1f}ms, "
+            f"p95 {percentile(latencies, 95) * 1000:.1f}ms, "
+            f"p99 {percentile(latencies, 99) * 1000:.1f}ms, "
+            f"max {max(latencies) * 1000:.1f}ms"
+        )
+
+    return delivered == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the live signal feed on localhost.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--signals", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between publishes")
+    parser.add_argument("--connect-timeout", type=float, default=30, help="seconds to wait for all subscribers")
+    parser.add_argument("--spawn-server", action="store_true", help="start signal_feed.py for the run")
+    args = parser.parse_args()
+
+    server = None
+
+    if args.spawn_server:
+        server = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT],
+            env={**os.environ, "SIGNAL_FEED_HOST": args.host, "SIGNAL_FEED_PORT": str(args.port)}
+        )
+        time.sleep(1)
+
+    try:
+        ok = asyncio.run(run(args.host, args.port, args.subscribers, args.signals, args.interval, args.connect_timeout))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    if not ok:
+        raise Exception("Not every subscriber received every signal")
+
+
+if __name__ == "__main__":
+    main()
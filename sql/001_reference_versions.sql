@@ -0,0 +1,12 @@
+-- Version rows used to invalidate local reference-table caches.
+-- Sync jobs bump a table's version after writing to it.
+
+create table if not exists reference_versions (
+    table_name text primary key,
+    version bigint not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+insert into reference_versions (table_name, version)
+values ('companies', 0), ('indices', 0), ('news_sources', 0)
+on conflict (table_name) do nothing;
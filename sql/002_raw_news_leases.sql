@@ -0,0 +1,102 @@
+-- Lease-based claiming of raw_news so several news_processor workers can
+-- run at once without double-inserting processed_events.
+
+alter table raw_news add column if not exists claimed_by text;
+alter table raw_news add column if not exists lease_expires_at timestamptz;
+
+create index if not exists raw_news_unprocessed_lease_idx
+    on raw_news (lease_expires_at, fetched_at)
+    where is_processed = false;
+
+-- Claim up to p_batch_size unprocessed rows that are unleased or whose
+-- lease has expired. SKIP LOCKED keeps concurrent claims disjoint.
+create or replace function claim_raw_news(
+    p_worker text,
+    p_batch_size integer,
+    p_lease_seconds integer
+)
+returns setof raw_news
+language sql
+as $$
+    with candidates as (
+        select id
+        from raw_news
+        where is_processed = false
+          and (lease_expires_at is null or lease_expires_at < now())
+        order by fetched_at
+        limit p_batch_size
+        for update skip locked
+    )
+    update raw_news r
+    set claimed_by = p_worker,
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+    from candidates c
+    where r.id = c.id
+    returning r.*;
+$$;
+
+-- Insert a batch's events and mark its articles processed in one
+-- transaction. Rows whose lease was taken over by another worker are
+-- skipped, so their events are never inserted twice.
+create or replace function complete_raw_news_batch(
+    p_worker text,
+    p_ids jsonb,
+    p_events jsonb
+)
+returns integer
+language plpgsql
+as $$
+declare
+    owned bigint[];
+begin
+    -- Lock the rows this worker still owns for the rest of the transaction.
+    -- Ids are cast once to raw_news.id's type so the primary key index is
+    -- used, and the owned set is reused by both statements below.
+    select coalesce(array_agg(locked.id), '{}')
+    into owned
+    from (
+        select id
+        from raw_news
+        where id = any (
+            select (jsonb_array_elements_text(p_ids))::bigint
+        )
+          and claimed_by = p_worker
+          and is_processed = false
+        for update
+    ) locked;
+
+    insert into processed_events (
+        raw_news_id,
+        company_id,
+        detected_keywords,
+        category,
+        base_score,
+        market_cap_boost,
+        final_score,
+        sentiment,
+        confidence_score,
+        processed_at
+    )
+    select
+        e.raw_news_id,
+        e.company_id,
+        e.detected_keywords,
+        e.category,
+        e.base_score,
+        e.market_cap_boost,
+        e.final_score,
+        e.sentiment,
+        e.confidence_score,
+        e.processed_at
+    from jsonb_populate_recordset(null::processed_events, p_events) e
+    where e.raw_news_id = any (owned);
+
+    update raw_news
+    set is_processed = true,
+        claimed_by = null,
+        lease_expires_at = null
+    where id = any (owned);
+
+    return cardinality(owned);
+end;
+$$;
@@ -0,0 +1,21 @@
+-- Composite signals: news for one company inside an aggregation window is
+-- folded into a single signals row that is updated in place.
+
+alter table signals add column if not exists raw_news_ids jsonb not null default '[]'::jsonb;
+alter table signals add column if not exists headline_count integer not null default 1;
+alter table signals add column if not exists headlines jsonb not null default '[]'::jsonb;
+alter table signals add column if not exists sources jsonb not null default '[]'::jsonb;
+alter table signals add column if not exists window_ends_at timestamptz;
+alter table signals add column if not exists updated_at timestamptz;
+
+update signals
+set raw_news_ids = jsonb_build_array(raw_news_id)
+where raw_news_ids = '[]'::jsonb
+  and raw_news_id is not null;
+
+create index if not exists signals_raw_news_ids_idx
+    on signals using gin (raw_news_ids);
+
+create index if not exists signals_open_window_idx
+    on signals (company_id, window_ends_at)
+    where is_active = true;
@@ -0,0 +1,26 @@
+-- 1-minute and daily OHLCV bars rolled up by sync_prices_snapshot, so
+-- intraday consumers can read bars instead of raw price snapshots.
+
+create table if not exists price_bars_1m (
+    company_id bigint not null,
+    bar_start timestamptz not null,
+    open numeric,
+    high numeric,
+    low numeric,
+    close numeric,
+    volume bigint,
+    primary key (company_id, bar_start)
+);
+
+create index if not exists price_bars_1m_start_idx on price_bars_1m (bar_start);
+
+create table if not exists price_bars_1d (
+    company_id bigint not null,
+    trade_date date not null,
+    open numeric,
+    high numeric,
+    low numeric,
+    close numeric,
+    volume bigint,
+    primary key (company_id, trade_date)
+);
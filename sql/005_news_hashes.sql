@@ -0,0 +1,16 @@
+-- Dedup keys for ingested news. archive.py deletes old raw_news rows, so
+-- their hash_signature cannot be the only record of what was already seen;
+-- this slim table is never archived.
+
+create table if not exists news_hashes (
+    hash_signature text primary key,
+    first_seen_at timestamptz not null default now()
+);
+
+insert into news_hashes (hash_signature, first_seen_at)
+select hash_signature, coalesce(fetched_at, now())
+from raw_news
+on conflict (hash_signature) do nothing;
+
+-- Rows archived before this migration are restored with:
+--   python archive.py --backfill-hashes
@@ -0,0 +1,15 @@
+-- Atomic version bump for reference_cache.bump_version. Reading the version
+-- and writing it back from the client let two concurrent sync jobs both
+-- land on the same number, leaving one job's writes cached as current.
+
+create or replace function bump_reference_version(p_table text)
+returns bigint
+language sql
+as $$
+    insert into reference_versions (table_name, version, updated_at)
+    values (p_table, 1, now())
+    on conflict (table_name) do update
+    set version = reference_versions.version + 1,
+        updated_at = now()
+    returning version;
+$$;
@@ -0,0 +1,25 @@
+-- raw_news ids still referenced by processed_events or by any composite
+-- signal, used by archive.py before deleting. Signals list every folded
+-- article in raw_news_ids, not just the raw_news_id that opened them.
+--
+-- raw_news_ids holds numbers, so jsonb ?| (string keys only) cannot match
+-- them and PostgREST's ov is array-only; containment per id uses the GIN
+-- index from 003.
+
+create or replace function referenced_raw_news(p_ids jsonb)
+returns table (raw_news_id bigint)
+language sql
+stable
+as $$
+    with ids as (
+        select distinct (jsonb_array_elements_text(p_ids))::bigint as id
+    )
+    select ids.id
+    from ids
+    where exists (
+        select 1 from processed_events e where e.raw_news_id = ids.id
+    )
+    or exists (
+        select 1 from signals s where s.raw_news_ids @> jsonb_build_array(ids.id)
+    );
+$$;
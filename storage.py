@@ -0,0 +1,973 @@
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+# ==============================
+# Load Environment Variables
+# ==============================
+
+load_dotenv()
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "navi.db")
+
+# ==============================
+# Local Cache Scope
+# ==============================
+
+def cache_scope(backend, location):
+    # Short stable name for local caches keyed to one database
+    return f"{backend}-{zlib.crc32(location.encode('utf-8')):08x}"
+
+# ==============================
+# Supabase Backend
+# ==============================
+
+class SupabaseStorage:
+    def __init__(self, client):
+        self.client = client
+        self.cache_scope = cache_scope("supabase", str(getattr(client, "supabase_url", "")))
+
+    # ---------- Reference tables ----------
+
+    def fetch_companies(self):
+        result = (
+            self.client.table("companies")
+            .select("id,name,symbol")
+            .eq("exchange", "NSE")
+            .execute()
+        )
+        return result.data
+
+    def fetch_rss_sources(self):
+        result = (
+            self.client.table("news_sources")
+            .select("id,name,base_url")
+            .eq("type", "RSS")
+            .eq("is_active", True)
+            .execute()
+        )
+        return result.data
+
+    def fetch_news_sources(self):
+        result = self.client.table("news_sources").select("id,name").execute()
+        return result.data or []
+
+    def get_reference_version(self, table_name):
+        result = (
+            self.client.table("reference_versions")
+            .select("version")
+            .eq("table_name", table_name)
+            .execute()
+        )
+        return result.data[0]["version"] if result.data else 0
+
+    def bump_reference_version(self, table_name):
+        # One statement server-side, so concurrent sync jobs never reuse a version
+        result = self.client.rpc(
+            "bump_reference_version",
+            {"p_table": table_name}
+        ).execute()
+        return result.data
+
+    # ---------- Ingestion ----------
+
+    def insert_news_if_new(self, row):
+        # news_hashes outlives archived raw_news rows, so it is the dedup key
+        claimed = self.client.table("news_hashes").upsert(
+            {"hash_signature": row["hash_signature"]},
+            on_conflict="hash_signature",
+            ignore_duplicates=True
+        ).execute()
+
+        if not claimed.data:
+            return False
+
+        try:
+            self.client.table("raw_news").insert(row).execute()
+        except Exception:
+            # Release the hash so the next run can retry the article
+            (
+                self.client.table("news_hashes")
+                .delete()
+                .eq("hash_signature", row["hash_signature"])
+                .execute()
+            )
+            raise
+
+        return True
+
+    def record_news_hashes(self, hashes):
+        self.client.table("news_hashes").upsert(
+            [{"hash_signature": h} for h in hashes],
+            on_conflict="hash_signature",
+            ignore_duplicates=True
+        ).execute()
+
+    def fetch_publish_history(self, since, page_size=1000):
+        rows = []
+
+        # PostgREST caps each response, so page through the window
+        while True:
+            result = (
+                self.client.table("raw_news")
+                .select("source_id,published_at")
+                .gte("published_at", since)
+                .order("published_at")
+                .range(len(rows), len(rows) + page_size - 1)
+                .execute()
+            )
+            rows.extend(result.data or [])
+
+            if len(result.data or []) < page_size:
+                return rows
+
+    # ---------- Processing ----------
+
+    def claim_news_batch(self, worker_id, batch_size, lease_seconds):
+        result = self.client.rpc(
+            "claim_raw_news",
+            {
+                "p_worker": worker_id,
+                "p_batch_size": batch_size,
+                "p_lease_seconds": lease_seconds
+            }
+        ).execute()
+        return result.data or []
+
+    def complete_news_batch(self, worker_id, article_ids, events):
+        result = self.client.rpc(
+            "complete_raw_news_batch",
+            {
+                "p_worker": worker_id,
+                "p_ids": article_ids,
+                "p_events": events
+            }
+        ).execute()
+        return result.data or 0
+
+    # ---------- Signals ----------
+
+    def fetch_recent_events(self, since):
+        result = (
+            self.client.table("processed_events")
+            .select("id, raw_news_id, company_id, processed_at")
+            .gte("processed_at", since)
+            .execute()
+        )
+        return result.data or []
+
+    def fetch_article(self, raw_news_id):
+        result = (
+            self.client.table("raw_news")
+            .select("title, content, source_id, fetched_at")
+            .eq("id", raw_news_id)
+            .single()
+            .execute()
+        )
+        return result.data or {}
+
+    def signal_exists(self, raw_news_id):
+        result = (
+            self.client.table("signals")
+            .select("id")
+            # raw_news_ids is jsonb; .contains() would send a Postgres array literal
+            .filter("raw_news_ids", "cs", json.dumps([raw_news_id]))
+            .execute()
+        )
+        return bool(result.data)
+
+    def fetch_open_signal(self, company_id, at, latest_end):
+        # Signal whose window contains `at`: at < window_ends_at <= at + window
+        result = (
+            self.client.table("signals")
+            .select("*")
+            .eq("company_id", company_id)
+            .eq("is_active", True)
+            .gt("window_ends_at", at)
+            .lte("window_ends_at", latest_end)
+            .order("generated_at", desc=True)
+            .limit(1)
+            .execute()
+        )
+        return result.data[0] if result.data else None
+
+    def insert_signal(self, signal):
+        result = self.client.table("signals").insert(signal).execute()
+        return result.data[0]
+
+    def update_signal(self, signal_id, updates):
+        self.client.table("signals").update(updates).eq("id", signal_id).execute()
+
+    def fetch_company_name(self, company_id):
+        result = (
+            self.client.table("companies")
+            .select("name")
+            .eq("id", company_id)
+            .single()
+            .execute()
+        )
+        return result.data["name"]
+
+    # ---------- Companies & prices ----------
+
+    def upsert_companies(self, rows):
+        result = self.client.table("companies").upsert(
+            rows,
+            on_conflict="symbol"
+        ).execute()
+        return [r["id"] for r in result.data or []]
+
+    def insert_missing_companies(self, rows):
+        # Existing rows keep their name and other fields; returns {symbol: id}
+        if rows:
+            self.client.table("companies").upsert(
+                rows,
+                on_conflict="symbol",
+                ignore_duplicates=True
+            ).execute()
+
+        symbols = [r["symbol"] for r in rows]
+        ids = {}
+
+        for start in range(0, len(symbols), 200):
+            result = (
+                self.client.table("companies")
+                .select("id,symbol")
+                .in_("symbol", symbols[start:start + 200])
+                .execute()
+            )
+            ids.update((r["symbol"], r["id"]) for r in result.data or [])
+
+        return ids
+
+    def fetch_indices(self):
+        result = self.client.table("indices").select("id,name").execute()
+        return result.data or []
+
+    def sync_index_membership(self, index_id, company_ids):
+        # Mark all existing members inactive
+        (
+            self.client.table("index_membership")
+            .update({"is_active": False})
+            .eq("index_id", index_id)
+            .execute()
+        )
+
+        # Reactivate current members
+        if company_ids:
+            self.client.table("index_membership").upsert(
+                [
+                    {"index_id": index_id, "company_id": cid, "is_active": True}
+                    for cid in company_ids
+                ],
+                on_conflict="index_id,company_id"
+            ).execute()
+
+    def insert_prices(self, rows):
+        self.client.table("prices").insert(rows).execute()
+
+    def upsert_minute_bars(self, rows):
+        self.client.table("price_bars_1m").upsert(
+            rows,
+            on_conflict="company_id,bar_start"
+        ).execute()
+
+    def upsert_daily_bars(self, rows):
+        self.client.table("price_bars_1d").upsert(
+            rows,
+            on_conflict="company_id,trade_date"
+        ).execute()
+
+    # ---------- Archival ----------
+
+    def fetch_expired_rows(self, table, ts_column, cutoff, offset, limit):
+        query = self.client.table(table).select("*").lt(ts_column, cutoff)
+
+        # Unprocessed news stays hot until news_processor has seen it
+        if table == "raw_news":
+            query = query.eq("is_processed", True)
+
+        result = (
+            query
+            .order(ts_column)
+            .order("id")
+            .range(offset, offset + limit - 1)
+            .execute()
+        )
+        return result.data or []
+
+    def referenced_news_ids(self, ids):
+        # Matches every id folded into a composite signal, not only the
+        # raw_news_id that opened it
+        result = self.client.rpc("referenced_raw_news", {"p_ids": ids}).execute()
+        return {r["raw_news_id"] for r in result.data or []}
+
+    def delete_rows(self, table, ids):
+        self.client.table(table).delete().in_("id", ids).execute()
+
+# ==============================
+# SQLite Backend
+# ==============================
+
+SQLITE_SCHEMA = """
+create table if not exists companies (
+    id integer primary key autoincrement,
+    symbol text not null unique,
+    name text,
+    isin text,
+    exchange text,
+    is_listed integer default 1
+);
+create index if not exists companies_exchange_idx on companies (exchange);
+
+create table if not exists indices (
+    id integer primary key autoincrement,
+    name text not null unique
+);
+
+create table if not exists index_membership (
+    index_id integer not null,
+    company_id integer not null,
+    is_active integer not null default 1,
+    primary key (index_id, company_id)
+);
+
+create table if not exists news_sources (
+    id integer primary key autoincrement,
+    name text not null,
+    base_url text,
+    type text,
+    is_active integer not null default 1
+);
+
+create table if not exists raw_news (
+    id integer primary key autoincrement,
+    source_id integer,
+    title text,
+    content text,
+    url text,
+    published_at text,
+    fetched_at text,
+    is_processed integer not null default 0,
+    hash_signature text not null unique,
+    claimed_by text,
+    lease_expires_at text
+);
+create index if not exists raw_news_unprocessed_idx
+    on raw_news (lease_expires_at, fetched_at) where is_processed = 0;
+create index if not exists raw_news_fetched_at_idx on raw_news (fetched_at);
+create index if not exists raw_news_published_at_idx on raw_news (published_at);
+
+-- Never archived, unlike raw_news
+create table if not exists news_hashes (
+    hash_signature text primary key,
+    first_seen_at text
+);
+
+create table if not exists processed_events (
+    id integer primary key autoincrement,
+    raw_news_id integer not null,
+    company_id integer,
+    detected_keywords text,
+    category text,
+    base_score real,
+    market_cap_boost real,
+    final_score real,
+    sentiment text,
+    confidence_score real,
+    processed_at text
+);
+create index if not exists processed_events_processed_at_idx on processed_events (processed_at);
+create index if not exists processed_events_raw_news_idx on processed_events (raw_news_id);
+
+create table if not exists signals (
+    id integer primary key autoincrement,
+    company_id integer,
+    raw_news_id integer,
+    raw_news_ids text not null default '[]',
+    signal_type text,
+    severity text,
+    signal_score real,
+    headline_count integer not null default 1,
+    headlines text not null default '[]',
+    sources text not null default '[]',
+    generated_at text,
+    window_ends_at text,
+    updated_at text,
+    is_active integer not null default 1
+);
+create index if not exists signals_open_window_idx
+    on signals (company_id, window_ends_at) where is_active = 1;
+
+-- Lookup table standing in for the GIN index on signals.raw_news_ids
+create table if not exists signal_news (
+    raw_news_id integer primary key,
+    signal_id integer not null
+);
+
+create table if not exists prices (
+    id integer primary key autoincrement,
+    company_id integer not null,
+    price real,
+    open real,
+    high real,
+    low real,
+    volume real,
+    change real,
+    pchange real,
+    created_at text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+create index if not exists prices_company_created_idx on prices (company_id, created_at);
+create index if not exists prices_created_at_idx on prices (created_at);
+
+create table if not exists price_bars_1m (
+    company_id integer not null,
+    bar_start text not null,
+    open real,
+    high real,
+    low real,
+    close real,
+    volume real,
+    primary key (company_id, bar_start)
+);
+create index if not exists price_bars_1m_start_idx on price_bars_1m (bar_start);
+
+create table if not exists price_bars_1d (
+    company_id integer not null,
+    trade_date text not null,
+    open real,
+    high real,
+    low real,
+    close real,
+    volume real,
+    primary key (company_id, trade_date)
+);
+
+create table if not exists reference_versions (
+    table_name text primary key,
+    version integer not null default 0,
+    updated_at text
+);
+"""
+
+JSON_COLUMNS = {
+    "processed_events": ("detected_keywords",),
+    "signals": ("raw_news_ids", "headlines", "sources")
+}
+
+BOOL_COLUMNS = {
+    "raw_news": ("is_processed",),
+    "signals": ("is_active",),
+    "news_sources": ("is_active",),
+    "companies": ("is_listed",),
+    "index_membership": ("is_active",)
+}
+
+
+class SQLiteStorage:
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.cache_scope = cache_scope("sqlite", os.path.abspath(path))
+
+        with self.connect() as conn:
+            conn.executescript(SQLITE_SCHEMA)
+
+    def connect(self):
+        conn = getattr(self.local, "conn", None)
+
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self.local.conn = conn
+
+        return _Transaction(conn)
+
+    # ---------- Row conversion ----------
+
+    def encode(self, table, row):
+        encoded = dict(row)
+
+        for column in JSON_COLUMNS.get(table, ()):
+            if column in encoded and not isinstance(encoded[column], str):
+                encoded[column] = json.dumps(encoded[column])
+
+        for column in BOOL_COLUMNS.get(table, ()):
+            if column in encoded and encoded[column] is not None:
+                encoded[column] = int(bool(encoded[column]))
+
+        return encoded
+
+    def decode(self, table, row):
+        if row is None:
+            return None
+
+        decoded = dict(row)
+
+        for column in JSON_COLUMNS.get(table, ()):
+            if decoded.get(column) is not None:
+                decoded[column] = json.loads(decoded[column])
+
+        for column in BOOL_COLUMNS.get(table, ()):
+            if decoded.get(column) is not None:
+                decoded[column] = bool(decoded[column])
+
+        return decoded
+
+    def insert(self, conn, table, row):
+        row = self.encode(table, row)
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+
+        cursor = conn.execute(
+            f"insert into {table} ({columns}) values ({placeholders})",
+            list(row.values())
+        )
+        return cursor.lastrowid
+
+    # ---------- Reference tables ----------
+
+    def fetch_companies(self):
+        with self.connect() as conn:
+            rows = conn.execute(
+                "select id, name, symbol from companies where exchange = 'NSE'"
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def fetch_rss_sources(self):
+        with self.connect() as conn:
+            rows = conn.execute(
+                "select id, name, base_url from news_sources where type = 'RSS' and is_active = 1"
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def fetch_news_sources(self):
+        with self.connect() as conn:
+            rows = conn.execute("select id, name from news_sources").fetchall()
+        return [dict(r) for r in rows]
+
+    def get_reference_version(self, table_name):
+        with self.connect() as conn:
+            row = conn.execute(
+                "select version from reference_versions where table_name = ?",
+                (table_name,)
+            ).fetchone()
+        return row["version"] if row else 0
+
+    def bump_reference_version(self, table_name):
+        with self.connect() as conn:
+            conn.begin_immediate()
+            conn.execute(
+                """
+                insert into reference_versions (table_name, version, updated_at)
+                values (?, 1, ?)
+                on conflict (table_name) do update
+                set version = reference_versions.version + 1,
+                    updated_at = excluded.updated_at
+                """,
+                (table_name, datetime.now(timezone.utc).isoformat())
+            )
+            row = conn.execute(
+                "select version from reference_versions where table_name = ?",
+                (table_name,)
+            ).fetchone()
+        return row["version"]
+
+    # ---------- Ingestion ----------
+
+    def insert_news_if_new(self, row):
+        row = self.encode("raw_news", row)
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+
+        with self.connect() as conn:
+            # news_hashes outlives archived raw_news rows, so it is the dedup key
+            cursor = conn.execute(
+                "insert into news_hashes (hash_signature, first_seen_at) values (?, ?) "
+                "on conflict (hash_signature) do nothing",
+                (row["hash_signature"], datetime.now(timezone.utc).isoformat())
+            )
+
+            if cursor.rowcount == 0:
+                return False
+
+            cursor = conn.execute(
+                f"insert into raw_news ({columns}) values ({placeholders}) "
+                "on conflict (hash_signature) do nothing",
+                list(row.values())
+            )
+        return cursor.rowcount > 0
+
+    def record_news_hashes(self, hashes):
+        now = datetime.now(timezone.utc).isoformat()
+
+        with self.connect() as conn:
+            conn.executemany(
+                "insert into news_hashes (hash_signature, first_seen_at) values (?, ?) "
+                "on conflict (hash_signature) do nothing",
+                [(h, now) for h in hashes]
+            )
+
+    def fetch_publish_history(self, since):
+        with self.connect() as conn:
+            rows = conn.execute(
+                "select source_id, published_at from raw_news where published_at >= ?",
+                (since,)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    # ---------- Processing ----------
+
+    def claim_news_batch(self, worker_id, batch_size, lease_seconds):
+        now = datetime.now(timezone.utc)
+        lease_expires_at = (now + timedelta(seconds=lease_seconds)).isoformat()
+
+        # BEGIN IMMEDIATE serialises claims across processes sharing the file
+        with self.connect() as conn:
+            conn.begin_immediate()
+
+            rows = conn.execute(
+                """
+                select * from raw_news
+                where is_processed = 0
+                  and (lease_expires_at is null or lease_expires_at < ?)
+                order by fetched_at
+                limit ?
+                """,
+                (now.isoformat(), batch_size)
+            ).fetchall()
+
+            ids = [r["id"] for r in rows]
+
+            conn.executemany(
+                "update raw_news set claimed_by = ?, lease_expires_at = ? where id = ?",
+                [(worker_id, lease_expires_at, i) for i in ids]
+            )
+
+        claimed = []
+        for r in rows:
+            row = self.decode("raw_news", r)
+            row["claimed_by"] = worker_id
+            row["lease_expires_at"] = lease_expires_at
+            claimed.append(row)
+
+        return claimed
+
+    def complete_news_batch(self, worker_id, article_ids, events):
+        with self.connect() as conn:
+            conn.begin_immediate()
+
+            placeholders = ", ".join("?" for _ in article_ids)
+            owned = {
+                r["id"] for r in conn.execute(
+                    f"""
+                    select id from raw_news
+                    where id in ({placeholders})
+                      and claimed_by = ?
+                      and is_processed = 0
+                    """,
+                    [*article_ids, worker_id]
+                ).fetchall()
+            }
+
+            for event in events:
+                if event["raw_news_id"] in owned:
+                    self.insert(conn, "processed_events", event)
+
+            conn.executemany(
+                """
+                update raw_news
+                set is_processed = 1, claimed_by = null, lease_expires_at = null
+                where id = ?
+                """,
+                [(i,) for i in owned]
+            )
+
+        return len(owned)
+
+    # ---------- Signals ----------
+
+    def fetch_recent_events(self, since):
+        with self.connect() as conn:
+            rows = conn.execute(
+                """
+                select id, raw_news_id, company_id, processed_at
+                from processed_events
+                where processed_at >= ?
+                """,
+                (since,)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def fetch_article(self, raw_news_id):
+        with self.connect() as conn:
+            row = conn.execute(
+                "select title, content, source_id, fetched_at from raw_news where id = ?",
+                (raw_news_id,)
+            ).fetchone()
+        return dict(row) if row else {}
+
+    def signal_exists(self, raw_news_id):
+        with self.connect() as conn:
+            row = conn.execute(
+                "select 1 from signal_news where raw_news_id = ?",
+                (raw_news_id,)
+            ).fetchone()
+        return row is not None
+
+    def fetch_open_signal(self, company_id, at, latest_end):
+        with self.connect() as conn:
+            row = conn.execute(
+                """
+                select * from signals
+                where company_id = ? and is_active = 1
+                  and window_ends_at > ? and window_ends_at <= ?
+                order by generated_at desc
+                limit 1
+                """,
+                (company_id, at, latest_end)
+            ).fetchone()
+        return self.decode("signals", row)
+
+    def insert_signal(self, signal):
+        with self.connect() as conn:
+            signal_id = self.insert(conn, "signals", signal)
+            conn.executemany(
+                "insert or ignore into signal_news (raw_news_id, signal_id) values (?, ?)",
+                [(i, signal_id) for i in signal.get("raw_news_ids") or []]
+            )
+            row = conn.execute("select * from signals where id = ?", (signal_id,)).fetchone()
+        return self.decode("signals", row)
+
+    def update_signal(self, signal_id, updates):
+        encoded = self.encode("signals", updates)
+        assignments = ", ".join(f"{column} = ?" for column in encoded)
+
+        with self.connect() as conn:
+            conn.execute(
+                f"update signals set {assignments} where id = ?",
+                [*encoded.values(), signal_id]
+            )
+            conn.executemany(
+                "insert or ignore into signal_news (raw_news_id, signal_id) values (?, ?)",
+                [(i, signal_id) for i in updates.get("raw_news_ids") or []]
+            )
+
+    def fetch_company_name(self, company_id):
+        with self.connect() as conn:
+            row = conn.execute(
+                "select name from companies where id = ?",
+                (company_id,)
+            ).fetchone()
+        return row["name"]
+
+    # ---------- Companies & prices ----------
+
+    def upsert_companies(self, rows):
+        if not rows:
+            return []
+
+        rows = [self.encode("companies", r) for r in rows]
+        columns = list(rows[0])
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "symbol")
+
+        with self.connect() as conn:
+            conn.executemany(
+                f"""
+                insert into companies ({", ".join(columns)})
+                values ({", ".join("?" for _ in columns)})
+                on conflict (symbol) do update set {updates}
+                """,
+                [[r[c] for c in columns] for r in rows]
+            )
+
+            symbols = [r["symbol"] for r in rows]
+            ids = {}
+            for start in range(0, len(symbols), 500):
+                chunk = symbols[start:start + 500]
+                for r in conn.execute(
+                    f"select id, symbol from companies where symbol in ({', '.join('?' for _ in chunk)})",
+                    chunk
+                ).fetchall():
+                    ids[r["symbol"]] = r["id"]
+
+        return [ids[s] for s in symbols if s in ids]
+
+    def insert_missing_companies(self, rows):
+        if not rows:
+            return {}
+
+        rows = [self.encode("companies", r) for r in rows]
+        columns = list(rows[0])
+
+        with self.connect() as conn:
+            conn.executemany(
+                f"""
+                insert into companies ({", ".join(columns)})
+                values ({", ".join("?" for _ in columns)})
+                on conflict (symbol) do nothing
+                """,
+                [[r[c] for c in columns] for r in rows]
+            )
+
+            symbols = [r["symbol"] for r in rows]
+            ids = {}
+            for start in range(0, len(symbols), 500):
+                chunk = symbols[start:start + 500]
+                for r in conn.execute(
+                    f"select id, symbol from companies where symbol in ({', '.join('?' for _ in chunk)})",
+                    chunk
+                ).fetchall():
+                    ids[r["symbol"]] = r["id"]
+
+        return ids
+
+    def fetch_indices(self):
+        with self.connect() as conn:
+            rows = conn.execute("select id, name from indices").fetchall()
+        return [dict(r) for r in rows]
+
+    def sync_index_membership(self, index_id, company_ids):
+        with self.connect() as conn:
+            conn.execute(
+                "update index_membership set is_active = 0 where index_id = ?",
+                (index_id,)
+            )
+            conn.executemany(
+                """
+                insert into index_membership (index_id, company_id, is_active)
+                values (?, ?, 1)
+                on conflict (index_id, company_id) do update set is_active = 1
+                """,
+                [(index_id, cid) for cid in company_ids]
+            )
+
+    def insert_prices(self, rows):
+        with self.connect() as conn:
+            for row in rows:
+                self.insert(conn, "prices", row)
+
+    def upsert_bars(self, table, key_columns, rows):
+        if not rows:
+            return
+
+        columns = list(rows[0])
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in key_columns)
+
+        with self.connect() as conn:
+            conn.executemany(
+                f"""
+                insert into {table} ({", ".join(columns)})
+                values ({", ".join("?" for _ in columns)})
+                on conflict ({", ".join(key_columns)}) do update set {updates}
+                """,
+                [[r[c] for c in columns] for r in rows]
+            )
+
+    def upsert_minute_bars(self, rows):
+        self.upsert_bars("price_bars_1m", ("company_id", "bar_start"), rows)
+
+    def upsert_daily_bars(self, rows):
+        self.upsert_bars("price_bars_1d", ("company_id", "trade_date"), rows)
+
+    # ---------- Archival ----------
+
+    def fetch_expired_rows(self, table, ts_column, cutoff, offset, limit):
+        processed_filter = " and is_processed = 1" if table == "raw_news" else ""
+
+        with self.connect() as conn:
+            rows = conn.execute(
+                f"""
+                select * from {table}
+                where {ts_column} < ?{processed_filter}
+                order by {ts_column}, id
+                limit ? offset ?
+                """,
+                (cutoff, limit, offset)
+            ).fetchall()
+        return [self.decode(table, r) for r in rows]
+
+    def referenced_news_ids(self, ids):
+        placeholders = ", ".join("?" for _ in ids)
+
+        with self.connect() as conn:
+            rows = conn.execute(
+                f"""
+                select raw_news_id from processed_events where raw_news_id in ({placeholders})
+                union
+                select raw_news_id from signal_news where raw_news_id in ({placeholders})
+                """,
+                [*ids, *ids]
+            ).fetchall()
+        return {r["raw_news_id"] for r in rows}
+
+    def delete_rows(self, table, ids):
+        placeholders = ", ".join("?" for _ in ids)
+
+        with self.connect() as conn:
+            conn.execute(f"delete from {table} where id in ({placeholders})", ids)
+
+
+class _Transaction:
+    # Wraps a connection in an explicit transaction for one `with` block
+    def __init__(self, conn):
+        self.conn = conn
+        self.started = False
+
+    def begin_immediate(self):
+        self.conn.execute("begin immediate")
+        self.started = True
+
+    def execute(self, *args):
+        self.ensure_started()
+        return self.conn.execute(*args)
+
+    def executemany(self, *args):
+        self.ensure_started()
+        return self.conn.executemany(*args)
+
+    def executescript(self, script):
+        return self.conn.executescript(script)
+
+    def ensure_started(self):
+        if not self.started:
+            self.conn.execute("begin")
+            self.started = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.started:
+            self.conn.execute("rollback" if exc_type else "commit")
+        return False
+
+# ==============================
+# Backend Selection
+# ==============================
+
+def get_storage(backend=None):
+    backend = backend or STORAGE_BACKEND
+
+    if backend == "sqlite":
+        return SQLiteStorage(SQLITE_PATH)
+
+    if backend != "supabase":
+        raise Exception(f"Unknown STORAGE_BACKEND: {backend}")
+
+    from supabase import create_client
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+
+    if not url or not key:
+        raise Exception("Missing SUPABASE credentials in .env")
+
+    return SupabaseStorage(create_client(url, key))
@@ -1,43 +1,139 @@
-import requests
 import os
-from supabase import create_client
-from dotenv import load_dotenv
+import pickle
+import sys
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from fetch_health import guarded_fetch
+from reference_cache import bump_version
+from storage import get_storage
+
+# ==============================
+# Storage Backend
+# ==============================
+
+storage = get_storage()
+
+# ==============================
+# NSE Session Settings
+# ==============================
+
+NSE_HOME_URL = "https://www.nseindia.com"
+NSE_INDEX_URL = "https://www.nseindia.com/api/equity-stockIndices?index={index}"
+
+NSE_TIMEOUT_SECONDS = 10
+NSE_COOKIE_PATH = os.getenv("NSE_COOKIE_PATH", ".cache/nse_cookies.pkl")
+NSE_MAX_WORKERS = int(os.getenv("NSE_MAX_WORKERS", "4"))
+NSE_REQUESTS_PER_SECOND = float(os.getenv("NSE_REQUESTS_PER_SECOND", "3"))
+
+NSE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.nseindia.com/market-data/live-equity-market",
+    "Connection": "keep-alive"
+}
+
+# ==============================
+# Shared Rate Limit
+# ==============================
+
+class RateLimiter:
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait_for = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+rate_limiter = RateLimiter(NSE_REQUESTS_PER_SECOND)
 
 # ==============================
-# Load Environment Variables
+# Persistent NSE Session
 # ==============================
 
-load_dotenv()
+session = requests.Session()
+session.headers.update(NSE_HEADERS)
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=NSE_MAX_WORKERS))
+
+warm_lock = threading.Lock()
+warm_generation = 0
+
+
+def load_cookies():
+    if not os.path.exists(NSE_COOKIE_PATH):
+        return False
+
+    try:
+        with open(NSE_COOKIE_PATH, "rb") as f:
+            session.cookies.update(pickle.load(f))
+        return True
+    except Exception as e:
+        print(f"⚠ Ignoring unreadable NSE cookie jar: {e}")
+        return False
+
+
+def save_cookies():
+    directory = os.path.dirname(NSE_COOKIE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(NSE_COOKIE_PATH, "wb") as f:
+        pickle.dump(session.cookies, f)
+
+
+def warm_session(seen_generation):
+    global warm_generation
+
+    with warm_lock:
+        # Another thread already re-warmed after this caller's rejection
+        if warm_generation != seen_generation:
+            return
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+        print("Warming NSE session cookies...")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise Exception("Missing SUPABASE credentials in .env")
+        rate_limiter.wait()
+        session.cookies.clear()
+        session.get(NSE_HOME_URL, timeout=NSE_TIMEOUT_SECONDS)
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        save_cookies()
+        warm_generation += 1
 
 # ==============================
 # NSE Fetch Logic
 # ==============================
 
-def fetch_nifty_500():
-    url = "https://www.nseindia.com/api/equity-stockIndices?index=NIFTY%20500"
+def nse_index_name(index_name):
+    # indices rows use NIFTY_500 style names; the NSE API expects NIFTY 500
+    return index_name.replace("_", " ")
+
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
-        "Accept": "application/json, text/plain, */*",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Referer": "https://www.nseindia.com/market-data/live-equity-market?symbol=NIFTY%20500",
-        "Connection": "keep-alive"
-    }
+def request_index(nse_name):
+    url = NSE_INDEX_URL.format(index=quote(nse_name))
 
-    session = requests.Session()
+    for attempt in range(2):
+        generation = warm_generation
 
-    # First request to establish cookies
-    session.get("https://www.nseindia.com", headers=headers)
+        rate_limiter.wait()
+        response = session.get(url, timeout=NSE_TIMEOUT_SECONDS)
+
+        # Re-warm only when NSE rejects the stored cookies
+        if response.status_code in (401, 403) and attempt == 0:
+            warm_session(generation)
+            continue
 
-    response = session.get(url, headers=headers)
+        break
 
     if response.status_code != 200:
         raise Exception(f"NSE API failed: {response.status_code}")
@@ -50,84 +146,106 @@ def fetch_nifty_500():
     return data["data"]
 
 
+def fetch_index(nse_name):
+    return guarded_fetch(f"nse:{nse_name}", lambda: request_index(nse_name))
+
+
+def fetch_nifty_500():
+    return fetch_index("NIFTY 500")
+
+
+def fetch_members(index):
+    nse_name = nse_index_name(index["name"])
+
+    symbols = []
+
+    for stock in fetch_index(nse_name):
+        symbol = stock.get("symbol")
+
+        # Skip index summary row
+        if not symbol or symbol == nse_name:
+            continue
+
+        symbols.append(symbol)
+
+    return symbols
+
+
 # ==============================
-# Supabase Logic
+# Storage Logic
 # ==============================
 
-def upsert_company(symbol, name):
-    result = supabase.table("companies").upsert(
-        {
-            "symbol": symbol,
-            "name": name,
-            "exchange": "NSE"
-        },
-        on_conflict="symbol"
-    ).execute()
-
-    return result.data[0]["id"]
-
-
-def sync_index_membership(company_ids):
-    # Fetch index ID
-    index = supabase.table("indices") \
-        .select("id") \
-        .eq("name", "NIFTY_500") \
-        .execute()
-
-    if not index.data:
-        raise Exception("NIFTY_500 index not found in indices table")
-
-    index_id = index.data[0]["id"]
-
-    # Mark all existing members inactive
-    supabase.table("index_membership") \
-        .update({"is_active": False}) \
-        .eq("index_id", index_id) \
-        .execute()
-
-    # Reactivate current members
-    for cid in company_ids:
-        supabase.table("index_membership").upsert(
-            {
-                "index_id": index_id,
-                "company_id": cid,
-                "is_active": True
-            },
-            on_conflict="index_id,company_id"
-        ).execute()
+def insert_companies(symbols):
+    # NSE endpoint does not provide full company name; the symbol is only a
+    # placeholder for new rows and never replaces a name already stored
+    return storage.insert_missing_companies([
+        {"symbol": symbol, "name": symbol, "exchange": "NSE"}
+        for symbol in symbols
+    ])
+
+
+def sync_members(members):
+    # Indices overlap heavily, so every symbol is written once, in a fixed
+    # order, before any membership rows reference it
+    symbols = sorted({symbol for _, index_symbols in members for symbol in index_symbols})
+    company_ids = insert_companies(symbols)
+
+    for index, index_symbols in sorted(members, key=lambda m: m[0]["name"]):
+        ids = [company_ids[s] for s in index_symbols if s in company_ids]
+        storage.sync_index_membership(index["id"], ids)
+
+        print(f"{index['name']}: {len(ids)} members synced.")
 
 
 # ==============================
 # Main Execution
 # ==============================
 
-def main():
-    print("Fetching Nifty 500 data...")
+def main(argv):
+    indices = storage.fetch_indices()
 
-    stocks = fetch_nifty_500()
+    if argv:
+        indices = [i for i in indices if i["name"] in argv]
 
-    print(f"Fetched {len(stocks)} stocks.")
+    if not indices:
+        raise Exception("No matching indices found in indices table")
 
-    company_ids = []
+    print(f"Syncing {len(indices)} indices from NSE...")
 
-    for stock in stocks:
-        symbol = stock.get("symbol")
+    started = time.time()
 
-       # Skip index summary row
-    if not symbol or symbol == "NIFTY 500":
-            continue
+    if not load_cookies():
+        warm_session(warm_generation)
+
+    members = []
+    failed = []
+
+    # Only the NSE requests run in parallel; writes happen once afterwards
+    with ThreadPoolExecutor(max_workers=NSE_MAX_WORKERS) as pool:
+        futures = {pool.submit(fetch_members, index): index for index in indices}
+
+        for future in as_completed(futures):
+            index = futures[future]
+
+            try:
+                members.append((index, future.result()))
+            except Exception as e:
+                failed.append(index["name"])
+                print(f"⚠ {index['name']} fetch failed: {e}")
+
+    sync_members(members)
 
-        # NSE endpoint does not provide full company name
-        name = symbol
+    # Keep any cookies NSE refreshed during the run for the next one
+    save_cookies()
 
-        cid = upsert_company(symbol, name)
-        company_ids.append(cid)
+    # Invalidate cached company lists held by other stages
+    bump_version(storage, "companies")
 
-    print("Updating index membership...")
-    sync_index_membership(company_ids)
+    print(f"Index sync completed in {time.time() - started:.1f}s.")
 
-    print("Nifty 500 sync completed successfully.")
+    if failed:
+        raise Exception(f"Index sync failed for: {', '.join(sorted(failed))}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sys.argv[1:])
@@ -1,23 +1,15 @@
 import requests
 import csv
 import io
-import os
-from supabase import create_client
-from dotenv import load_dotenv
+from fetch_health import guarded_fetch
+from reference_cache import bump_version
+from storage import get_storage
 
 # ==============================
-# Load Environment Variables
+# Storage Backend
 # ==============================
 
-load_dotenv()
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise Exception("Missing SUPABASE credentials in .env")
-
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+storage = get_storage()
 
 NSE_EQUITY_CSV = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
 
@@ -26,14 +18,20 @@ NSE_EQUITY_CSV = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
 # Fetch NSE Master Equity List
 # ==============================
 
-def fetch_nse_equities():
-    print("Fetching NSE master equity list...")
-
-    response = requests.get(NSE_EQUITY_CSV)
+def request_equity_csv():
+    response = requests.get(NSE_EQUITY_CSV, timeout=30)
 
     if response.status_code != 200:
         raise Exception(f"Failed to fetch NSE equity list: {response.status_code}")
 
+    return response
+
+
+def fetch_nse_equities():
+    print("Fetching NSE master equity list...")
+
+    response = guarded_fetch("nse:equity_list", request_equity_csv)
+
     decoded = response.content.decode("utf-8")
     decoded = decoded.replace('\ufeff', '')  # Remove BOM if present
 
@@ -55,29 +53,25 @@ def fetch_nse_equities():
 
 
 # ==============================
-# Upsert Company
+# Upsert Companies
 # ==============================
 
-def upsert_company(row):
+UPSERT_BATCH_SIZE = 500
+
+
+def company_row(row):
     symbol = row.get("SYMBOL", "")
-    name = row.get("NAME OF COMPANY", "")
-    isin = row.get("ISIN NUMBER", "")
 
     if not symbol:
         return None
 
-    result = supabase.table("companies").upsert(
-        {
-            "symbol": symbol,
-            "name": name,
-            "isin": isin,
-            "exchange": "NSE",
-            "is_listed": True
-        },
-        on_conflict="symbol"
-    ).execute()
-
-    return result.data[0]["id"] if result.data else None
+    return {
+        "symbol": symbol,
+        "name": row.get("NAME OF COMPANY", ""),
+        "isin": row.get("ISIN NUMBER", ""),
+        "exchange": "NSE",
+        "is_listed": True
+    }
 
 
 # ==============================
@@ -91,14 +85,17 @@ def main():
 
     print(f"Total NSE EQ equities found: {len(equities)}")
 
+    rows = [r for r in (company_row(e) for e in equities) if r]
+
     count = 0
 
-    for row in equities:
-        cid = upsert_company(row)
-        if cid:
-            count += 1
+    for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+        count += len(storage.upsert_companies(rows[i : i + UPSERT_BATCH_SIZE]))
 
     print(f"Upserted {count} companies into database.")
+
+    # Invalidate cached company lists held by other stages
+    bump_version(storage, "companies")
     print("NSE universe sync completed successfully.")
 
 
@@ -1,42 +1,59 @@
-import requests
+import json
 import os
+import requests
 import time
-from supabase import create_client
-from dotenv import load_dotenv
+from datetime import datetime, timedelta, timezone
+from fetch_health import CircuitOpenError, guarded_fetch
+from reference_cache import load_reference
+from storage import get_storage
 
 # ==============================
-# Load Environment Variables
+# Storage Backend
 # ==============================
 
-load_dotenv()
+storage = get_storage()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+YAHOO_QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+PRICE_STATE_PATH = os.getenv("PRICE_STATE_PATH", ".cache/price_state.json")
 
-YAHOO_QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+IST = timezone(timedelta(hours=5, minutes=30))
 
 
 # ==============================
 # Fetch NSE Symbols from DB
 # ==============================
 
-def fetch_nse_symbols():
-    result = (
-        supabase.table("companies")
-        .select("id,symbol")
-        .eq("exchange", "NSE")
-        .execute()
-    )
-
-    return result.data
+def load_nse_symbols():
+    return load_reference(storage, "companies", "nse_symbols", storage.fetch_companies)["rows"]
 
 
 # ==============================
 # Fetch Prices from Yahoo
 # ==============================
 
+YAHOO_SOURCE_KEY = "yahoo:quote"
+
+
+def request_quotes(yahoo_symbols, headers):
+    response = requests.get(
+        YAHOO_QUOTE_URL,
+        params={"symbols": ",".join(yahoo_symbols)},
+        headers=headers,
+        timeout=10,
+    )
+
+    print("Status:", response.status_code)
+
+    if response.status_code != 200:
+        raise Exception(f"Yahoo returned non-200 response: {response.text[:200]}")
+
+    if not response.text.strip():
+        raise Exception("Empty response from Yahoo")
+
+    return response.json()
+
+
 def fetch_prices(symbols):
     yahoo_symbols = [f"{s}.NS" for s in symbols]
 
@@ -46,37 +63,105 @@ def fetch_prices(symbols):
     }
 
     try:
-        response = requests.get(
-            YAHOO_QUOTE_URL,
-            params={"symbols": ",".join(yahoo_symbols)},
-            headers=headers,
-            timeout=10,
-        )
+        data = guarded_fetch(YAHOO_SOURCE_KEY, lambda: request_quotes(yahoo_symbols, headers))
+        return data.get("quoteResponse", {}).get("result", [])
 
-        print("Status:", response.status_code)
+    except CircuitOpenError:
+        print("⚠ Yahoo circuit open, skipping fetch")
+        return []
 
-        if response.status_code != 200:
-            print("⚠ Yahoo returned non-200 response")
-            print(response.text[:200])
-            return []
+    except Exception as e:
+        print("⚠ Error fetching prices:", e)
+        return []
 
-        if not response.text.strip():
-            print("⚠ Empty response from Yahoo")
-            return []
 
-        data = response.json()
-        return data.get("quoteResponse", {}).get("result", [])
+# ==============================
+# Last Snapshot State
+# ==============================
+
+def load_price_state():
+    if not os.path.exists(PRICE_STATE_PATH):
+        return {}
 
+    try:
+        with open(PRICE_STATE_PATH, encoding="utf-8") as f:
+            return json.load(f)
     except Exception as e:
-        print("⚠ Error fetching prices:", e)
-        return []
+        print(f"⚠ Ignoring unreadable price state: {e}")
+        return {}
+
+
+def save_price_state(state):
+    directory = os.path.dirname(PRICE_STATE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
 
+    tmp_path = f"{PRICE_STATE_PATH}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+    os.replace(tmp_path, PRICE_STATE_PATH)
+
+# ==============================
+# OHLCV Bars
+# ==============================
+
+def quote_time(stock):
+    market_time = stock.get("regularMarketTime")
+
+    if market_time:
+        return datetime.fromtimestamp(market_time, tz=timezone.utc)
+
+    return datetime.now(timezone.utc)
+
+
+def roll_minute_bar(previous, quoted_at, price, volume):
+    bar_start = quoted_at.replace(second=0, microsecond=0)
+    trade_date = bar_start.astimezone(IST).date().isoformat()
+
+    last_bar = (previous or {}).get("bar")
+
+    if last_bar and last_bar["start"] == bar_start.isoformat():
+        return {
+            **last_bar,
+            "high": max(last_bar["high"], price),
+            "low": min(last_bar["low"], price),
+            "close": price,
+            "volume": max((volume or 0) - last_bar["base_volume"], 0)
+        }
+
+    # Day volume is cumulative, so a bar's volume is measured from the last
+    # cumulative value seen before it opened. Without an earlier quote from
+    # the same trading day (first run mid-session, lost state, new day) the
+    # volume traded before this bar is unknown, so the bar starts from the
+    # current cumulative value rather than absorbing the whole day's volume.
+    if previous and last_bar and last_bar["trade_date"] == trade_date:
+        base_volume = previous.get("volume") or 0
+    else:
+        base_volume = volume or 0
+
+    return {
+        "start": bar_start.isoformat(),
+        "trade_date": trade_date,
+        "open": price,
+        "high": price,
+        "low": price,
+        "close": price,
+        "base_volume": base_volume,
+        "volume": max((volume or 0) - base_volume, 0)
+    }
 
 # ==============================
 # Insert Prices into DB
 # ==============================
 
-def insert_prices(price_data, symbol_map):
+def insert_prices(price_data, symbol_map, state):
+    rows = []
+    minute_bars = []
+    daily_bars = []
+    pending = {}
+
     for stock in price_data:
         raw_symbol = stock.get("symbol", "").replace(".NS", "")
         company_id = symbol_map.get(raw_symbol)
@@ -84,21 +169,70 @@ def insert_prices(price_data, symbol_map):
         if not company_id:
             continue
 
-        try:
-            supabase.table("prices").insert(
-                {
-                    "company_id": company_id,
-                    "price": stock.get("regularMarketPrice"),
-                    "open": stock.get("regularMarketOpen"),
-                    "high": stock.get("regularMarketDayHigh"),
-                    "low": stock.get("regularMarketDayLow"),
-                    "volume": stock.get("regularMarketVolume"),
-                    "change": stock.get("regularMarketChange"),
-                    "pchange": stock.get("regularMarketChangePercent"),
-                }
-            ).execute()
-        except Exception as e:
-            print(f"⚠ DB insert error for {raw_symbol}: {e}")
+        price = stock.get("regularMarketPrice")
+        volume = stock.get("regularMarketVolume")
+
+        if price is None:
+            continue
+
+        # Only write quotes that moved since the previous snapshot
+        previous = state.get(str(company_id))
+
+        if previous and previous["price"] == price and previous["volume"] == volume:
+            continue
+
+        rows.append(
+            {
+                "company_id": company_id,
+                "price": price,
+                "open": stock.get("regularMarketOpen"),
+                "high": stock.get("regularMarketDayHigh"),
+                "low": stock.get("regularMarketDayLow"),
+                "volume": volume,
+                "change": stock.get("regularMarketChange"),
+                "pchange": stock.get("regularMarketChangePercent"),
+            }
+        )
+
+        bar = roll_minute_bar(previous, quote_time(stock), price, volume)
+
+        minute_bars.append({
+            "company_id": company_id,
+            "bar_start": bar["start"],
+            "open": bar["open"],
+            "high": bar["high"],
+            "low": bar["low"],
+            "close": bar["close"],
+            "volume": bar["volume"]
+        })
+
+        daily_bars.append({
+            "company_id": company_id,
+            "trade_date": bar["trade_date"],
+            "open": stock.get("regularMarketOpen"),
+            "high": stock.get("regularMarketDayHigh"),
+            "low": stock.get("regularMarketDayLow"),
+            "close": price,
+            "volume": volume
+        })
+
+        pending[str(company_id)] = {"price": price, "volume": volume, "bar": bar}
+
+    if not rows:
+        return 0
+
+    try:
+        storage.insert_prices(rows)
+        storage.upsert_minute_bars(minute_bars)
+        storage.upsert_daily_bars(daily_bars)
+    except Exception as e:
+        print(f"⚠ DB insert error for batch of {len(rows)} prices: {e}")
+        return 0
+
+    # State only advances once the rows are stored
+    state.update(pending)
+
+    return len(rows)
 
 
 # ==============================
@@ -108,7 +242,7 @@ def insert_prices(price_data, symbol_map):
 def main():
     print("Starting price snapshot sync...")
 
-    companies = fetch_nse_symbols()
+    companies = load_nse_symbols()
     print(f"Fetched {len(companies)} NSE companies from DB.")
 
     symbol_map = {c["symbol"]: c["id"] for c in companies}
@@ -116,6 +250,9 @@ def main():
 
     batch_size = 50  # safer for Yahoo
 
+    state = load_price_state()
+    written = 0
+
     for i in range(0, len(symbols), batch_size):
         batch = symbols[i : i + batch_size]
 
@@ -124,12 +261,14 @@ def main():
         price_data = fetch_prices(batch)
 
         if price_data:
-            insert_prices(price_data, symbol_map)
+            written += insert_prices(price_data, symbol_map, state)
+            save_price_state(state)
         else:
             print("⚠ Skipping batch due to empty response")
 
         time.sleep(1)  # prevent rate limit
 
+    print(f"Wrote {written} changed prices of {len(symbols)} companies.")
     print("Price snapshot sync completed successfully.")
 
 
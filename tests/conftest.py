@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Scripts live at the repo root and import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Pipeline scripts open their backend at import time; keep that off Supabase
+# and out of the working tree
+SCRATCH_DIR = tempfile.mkdtemp(prefix="navi-tests-")
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(SCRATCH_DIR, "navi.db"))
+os.environ.setdefault("REFERENCE_CACHE_DIR", os.path.join(SCRATCH_DIR, "reference"))
+
+from storage import SQLiteStorage
+
+
+@pytest.fixture
+def sqlite_storage(tmp_path):
+    return SQLiteStorage(str(tmp_path / "navi.db"))
+
+
+def news_row(n, fetched_at="2026-01-05T09:00:00+00:00", **extra):
+    return {
+        "source_id": 1,
+        "title": f"Headline {n}",
+        "content": f"Body {n}",
+        "url": f"https://example.com/{n}",
+        "published_at": fetched_at,
+        "fetched_at": fetched_at,
+        "is_processed": False,
+        "hash_signature": f"hash-{n}",
+        **extra
+    }
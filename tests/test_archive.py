@@ -0,0 +1,42 @@
+import gzip
+import json
+import os
+
+from archive import archive_table, iter_archived_rows, load_manifest, save_manifest
+from conftest import news_row
+
+
+def test_archived_news_is_not_ingested_again(sqlite_storage, tmp_path):
+    assert sqlite_storage.insert_news_if_new(news_row(1))
+
+    with sqlite_storage.connect() as conn:
+        conn.execute("update raw_news set is_processed = 1")
+
+    archived = archive_table(
+        sqlite_storage, "raw_news", "fetched_at", "2026-02-01T00:00:00+00:00",
+        str(tmp_path / "archive"), 100
+    )
+
+    assert archived == 1
+    assert not sqlite_storage.insert_news_if_new(news_row(1))
+
+
+def test_archived_rows_are_deduplicated_within_a_day(tmp_path):
+    archive_dir = str(tmp_path)
+    manifest = {"files": []}
+
+    # Same row written by an interrupted batch and by the retry
+    for part in ("a", "b"):
+        relative = os.path.join("raw_news", "day=2026-01-05", f"part-{part}.jsonl.gz")
+        os.makedirs(os.path.join(archive_dir, os.path.dirname(relative)), exist_ok=True)
+
+        with gzip.open(os.path.join(archive_dir, relative), "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"id": 1, "fetched_at": "2026-01-05"}) + "\n")
+            f.write(json.dumps({"id": 2 if part == "a" else 3, "fetched_at": "2026-01-05"}) + "\n")
+
+        manifest["files"].append({"table": "raw_news", "day": "2026-01-05", "path": relative})
+
+    save_manifest(archive_dir, manifest)
+
+    assert [r["id"] for r in iter_archived_rows("raw_news", archive_dir)] == [1, 2, 3]
+    assert len(load_manifest(archive_dir)["files"]) == 2
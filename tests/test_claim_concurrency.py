@@ -0,0 +1,64 @@
+import multiprocessing
+from datetime import datetime, timezone
+
+import pytest
+
+from conftest import news_row
+from storage import SQLiteStorage
+
+ARTICLES = 2000
+WORKERS = 4
+
+
+def run_worker(path, worker_id, lease_seconds):
+    storage = SQLiteStorage(path)
+
+    while True:
+        batch = storage.claim_news_batch(worker_id, 10, lease_seconds)
+
+        if not batch:
+            return
+
+        events = [
+            {
+                "raw_news_id": article["id"],
+                "company_id": 1,
+                "processed_at": datetime.now(timezone.utc).isoformat()
+            }
+            for article in batch
+        ]
+        storage.complete_news_batch(worker_id, [a["id"] for a in batch], events)
+
+
+# lease_seconds=0 makes every lease expire at once, so workers keep taking
+# over each other's batches and only the current owner may complete one
+@pytest.mark.parametrize("lease_seconds", [300, 0])
+def test_concurrent_workers_never_duplicate_events(tmp_path, lease_seconds):
+    path = str(tmp_path / "navi.db")
+    storage = SQLiteStorage(path)
+
+    for n in range(ARTICLES):
+        storage.insert_news_if_new(news_row(n))
+
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=run_worker, args=(path, f"worker-{i}", lease_seconds))
+        for i in range(WORKERS)
+    ]
+
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+        assert worker.exitcode == 0
+
+    with storage.connect() as conn:
+        total, distinct = conn.execute(
+            "select count(*), count(distinct raw_news_id) from processed_events"
+        ).fetchone()
+        unprocessed = conn.execute(
+            "select count(*) from raw_news where is_processed = 0"
+        ).fetchone()[0]
+
+    assert total == distinct == ARTICLES
+    assert unprocessed == 0
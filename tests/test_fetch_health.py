@@ -0,0 +1,54 @@
+import multiprocessing
+
+import pytest
+
+import fetch_health
+
+WORKERS = 4
+FAILURES_PER_WORKER = 25
+
+
+@pytest.fixture(autouse=True)
+def health_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_health, "HEALTH_PATH", str(tmp_path / "fetch_health.json"))
+    monkeypatch.setattr(fetch_health, "_cache", {"stamp": None, "state": {}})
+
+
+def record_failures(worker):
+    for n in range(FAILURES_PER_WORKER):
+        fetch_health.record_failure("rss:shared", Exception(f"worker {worker} failure {n}"))
+        fetch_health.record_failure(f"rss:own-{worker}", Exception("down"))
+
+
+def test_concurrent_processes_keep_each_others_records():
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=record_failures, args=(i,)) for i in range(WORKERS)]
+
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    state = fetch_health.load_state()
+
+    assert state["rss:shared"]["failures"] == WORKERS * FAILURES_PER_WORKER
+    for i in range(WORKERS):
+        assert state[f"rss:own-{i}"]["failures"] == FAILURES_PER_WORKER
+
+
+def test_circuit_opened_elsewhere_is_seen_by_a_running_process():
+    # This process has already read the (healthy) state
+    fetch_health.record_success("nse:NIFTY 500", 120)
+    assert not fetch_health.is_open("nse:NIFTY 500")
+
+    other = multiprocessing.get_context("fork").Process(
+        target=lambda: [fetch_health.record_failure("nse:NIFTY 500", Exception("403"))
+                        for _ in range(fetch_health.FAILURE_THRESHOLD)]
+    )
+    other.start()
+    other.join(timeout=30)
+
+    assert fetch_health.is_open("nse:NIFTY 500")
+    with pytest.raises(fetch_health.CircuitOpenError):
+        fetch_health.guarded_fetch("nse:NIFTY 500", lambda: "never called")
@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import intraday_engine
+import reference_cache
+from conftest import news_row
+
+
+@pytest.fixture
+def engine(sqlite_storage, tmp_path, monkeypatch):
+    alerts = []
+
+    monkeypatch.setattr(reference_cache, "CACHE_DIR", str(tmp_path / "reference"))
+    monkeypatch.setattr(intraday_engine, "storage", sqlite_storage)
+    monkeypatch.setattr(intraday_engine, "send_telegram_alert", alerts.append)
+    monkeypatch.setattr(intraday_engine, "publish_signal", lambda signal: None)
+
+    [company_id] = sqlite_storage.upsert_companies([{"symbol": "ACME", "name": "Acme", "exchange": "NSE"}])
+    return sqlite_storage, company_id, alerts
+
+
+def add_event(storage, company_id, n, title, fetched_at):
+    storage.insert_news_if_new(news_row(n, fetched_at=fetched_at, title=title, content=""))
+
+    with storage.connect() as conn:
+        raw_news_id = conn.execute(
+            "select id from raw_news where hash_signature = ?", (f"hash-{n}",)
+        ).fetchone()["id"]
+
+        storage.insert(conn, "processed_events", {
+            "raw_news_id": raw_news_id,
+            "company_id": company_id,
+            "processed_at": datetime.now(timezone.utc).isoformat()
+        })
+
+
+def test_direction_flip_at_same_severity_alerts(engine):
+    storage, company_id, alerts = engine
+    now = datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+
+    add_event(storage, company_id, 1, "Acme bags order win", now)     # +30 BUY MEDIUM
+    add_event(storage, company_id, 2, "Acme accused of fraud", now)   # -30 SELL MEDIUM
+
+    intraday_engine.generate_intraday_signals()
+
+    assert len(alerts) == 2
+    assert "BUY → SELL SIGNAL UPDATE" in alerts[1]
+    assert "Severity: *MEDIUM*" in alerts[1]
+
+
+def test_windows_follow_article_time_not_run_time(engine):
+    storage, company_id, alerts = engine
+
+    # Both processed in the same run, but fetched 30 minutes apart
+    add_event(storage, company_id, 1, "Acme bags order win", "2026-01-05T09:00:00")
+    add_event(storage, company_id, 2, "Acme bags another order win", "2026-01-05T09:30:00")
+    add_event(storage, company_id, 3, "Acme announces buyback", "2026-01-05T09:35:00")
+
+    intraday_engine.generate_intraday_signals()
+
+    with storage.connect() as conn:
+        rows = conn.execute("select headline_count, window_ends_at from signals order by id").fetchall()
+
+    assert [(r["headline_count"], r["window_ends_at"]) for r in rows] == [
+        (1, "2026-01-05T09:15:00+00:00"),
+        (2, "2026-01-05T09:45:00+00:00")
+    ]
+    assert [alert.split("\n")[1] for alert in alerts] == [
+        "🚨 *BUY SIGNAL*",
+        "🚨 *BUY SIGNAL*",
+        "🔁 *BUY SIGNAL UPDATE*"
+    ]
+
+
+def test_each_signal_is_written_once_per_run(engine, monkeypatch):
+    storage, company_id, alerts = engine
+    writes = []
+
+    for name in ("insert_signal", "update_signal"):
+        method = getattr(storage, name)
+        monkeypatch.setattr(storage, name, lambda *args, _m=method, _n=name: writes.append(_n) or _m(*args))
+
+    for n in range(6):
+        add_event(storage, company_id, n, "Acme bags order win", f"2026-01-05T09:0{n}:00")
+
+    intraday_engine.generate_intraday_signals()
+    assert writes == ["insert_signal"]
+
+    # A later run folding into the stored signal updates it once
+    for n in range(6, 10):
+        add_event(storage, company_id, n, "Acme bags order win", f"2026-01-05T09:0{n}:00")
+
+    intraday_engine.generate_intraday_signals()
+    assert writes == ["insert_signal", "update_signal"]
+
+    with storage.connect() as conn:
+        [row] = conn.execute("select headline_count from signals").fetchall()
+
+    assert row["headline_count"] == 10
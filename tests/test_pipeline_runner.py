@@ -0,0 +1,35 @@
+import pytest
+
+import pipeline_runner
+import poll_scheduler
+
+
+class StopLoop(Exception):
+    pass
+
+
+def test_downstream_runs_only_after_new_articles(tmp_path, monkeypatch):
+    monkeypatch.setattr(poll_scheduler, "POLL_STATE_PATH", str(tmp_path / "poll_state.json"))
+
+    tick = {"n": 0}
+    ran = []
+
+    def fake_run(script, *args):
+        if script == "news_ingestion.py":
+            poll_scheduler.mark_polled([1], inserted=1 if tick["n"] in (2, 3) else 0)
+        else:
+            ran.append((tick["n"], script))
+
+    def fake_sleep(seconds):
+        tick["n"] += 1
+        if tick["n"] > 5:
+            raise StopLoop
+
+    monkeypatch.setattr(pipeline_runner, "run", fake_run)
+    monkeypatch.setattr(pipeline_runner.time, "sleep", fake_sleep)
+
+    with pytest.raises(StopLoop):
+        pipeline_runner.run_loop()
+
+    # Tick 0 is the start-up catch-up; ticks 2 and 3 inserted articles
+    assert [t for t, script in ran if script == "intraday_engine.py"] == [0, 2, 3]
@@ -0,0 +1,128 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+import poll_scheduler
+from poll_scheduler import IST
+
+
+@pytest.fixture(autouse=True)
+def state_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "poll_state.json")
+    monkeypatch.setattr(poll_scheduler, "POLL_STATE_PATH", path)
+    return path
+
+
+@pytest.mark.parametrize("local, phase", [
+    (datetime(2026, 1, 5, 8, 59), "off_hours"),
+    (datetime(2026, 1, 5, 9, 0), "pre_open"),
+    (datetime(2026, 1, 5, 9, 14), "pre_open"),
+    (datetime(2026, 1, 5, 9, 15), "market"),
+    (datetime(2026, 1, 5, 15, 29), "market"),
+    (datetime(2026, 1, 5, 15, 30), "off_hours"),
+    (datetime(2026, 1, 9, 23, 59), "off_hours"),
+    (datetime(2026, 1, 10, 10, 0), "weekend"),
+    (datetime(2026, 1, 11, 23, 59), "weekend")
+])
+def test_market_phase_boundaries(local, phase):
+    assert poll_scheduler.market_phase(local.replace(tzinfo=IST)) == phase
+
+
+def test_market_phase_converts_utc_to_ist():
+    assert poll_scheduler.market_phase(poll_scheduler.parse_time("2026-01-05T03:30:00")) == "pre_open"
+    assert poll_scheduler.market_phase(poll_scheduler.parse_time("2026-01-05T10:00:00+00:00")) == "off_hours"
+
+
+def test_learn_rates_counts_per_phase_hour():
+    history = (
+        [{"source_id": 1, "published_at": "2026-01-05T05:00:00"}] * 5    # 10:30 IST, market
+        + [{"source_id": 1, "published_at": "2026-01-10T05:00:00"}] * 4  # Saturday
+        + [{"source_id": 2, "published_at": "2026-01-05T03:35:00"}]      # 09:05 IST, pre-open
+        + [{"source_id": None, "published_at": "2026-01-05T05:00:00"}, {"source_id": 3, "published_at": None}]
+    )
+
+    rates = poll_scheduler.learn_rates(history, days=7)
+
+    assert set(rates) == {"1", "2"}
+    assert rates["1"]["market"] == pytest.approx(5 / 31.25)
+    assert rates["1"]["weekend"] == pytest.approx(4 / 48)
+    assert rates["1"]["pre_open"] == 0
+    assert rates["2"]["pre_open"] == pytest.approx(1 / 1.25)
+
+    # Two weeks of history halves the rate
+    assert poll_scheduler.learn_rates(history, days=14)["1"]["market"] == pytest.approx(5 / 62.5)
+
+
+def set_limits(monkeypatch, budget, min_interval=1, max_interval=21600):
+    monkeypatch.setattr(poll_scheduler, "POLL_BUDGET_PER_HOUR", budget)
+    monkeypatch.setattr(poll_scheduler, "MIN_POLL_INTERVAL_SECONDS", min_interval)
+    monkeypatch.setattr(poll_scheduler, "MAX_POLL_INTERVAL_SECONDS", max_interval)
+
+
+def test_poll_intervals_weight_by_sqrt_rate(monkeypatch):
+    set_limits(monkeypatch, budget=30)
+
+    rates = {"a": {"market": 4.0}, "b": {"market": 1.0}}
+    intervals = poll_scheduler.poll_intervals(["a", "b"], rates, "market")
+
+    # Weights 2:1 split 30 polls/hour into 20 and 10
+    assert intervals == {"a": pytest.approx(180), "b": pytest.approx(360)}
+
+
+def test_poll_intervals_redistribute_capped_share(monkeypatch):
+    set_limits(monkeypatch, budget=100, min_interval=60)
+
+    rates = {"a": {"market": 100.0}, "b": {"market": 1.0}, "c": {"market": 1.0}}
+    intervals = poll_scheduler.poll_intervals(["a", "b", "c"], rates, "market")
+
+    # a would get 83 polls/hour but is capped at 60; b and c share the other 40
+    assert intervals == {"a": pytest.approx(60), "b": pytest.approx(180), "c": pytest.approx(180)}
+
+
+def test_poll_intervals_follow_phase_budget_share(monkeypatch):
+    set_limits(monkeypatch, budget=100)
+
+    rates = {"a": {"market": 1.0, "weekend": 1.0}}
+
+    assert poll_scheduler.poll_intervals(["a"], rates, "market")["a"] == pytest.approx(36)
+    assert poll_scheduler.poll_intervals(["a"], rates, "weekend")["a"] == pytest.approx(240)
+
+
+def test_silent_sources_stay_scheduled_up_to_the_max_interval(monkeypatch):
+    set_limits(monkeypatch, budget=10, max_interval=600)
+
+    rates = {"busy": {"market": 100.0}}
+    intervals = poll_scheduler.poll_intervals(["busy", "new"], rates, "market")
+
+    assert intervals["new"] == 600
+    assert intervals["busy"] < 600
+
+
+def test_corrupt_state_is_ignored(state_path, capsys):
+    with open(state_path, "w", encoding="utf-8") as f:
+        f.write('{"last_polled": {"1": ')
+
+    assert poll_scheduler.load_state() == {"last_polled": {}, "rates": {}, "rates_at": 0}
+    assert "Ignoring unreadable poll state" in capsys.readouterr().out
+
+    # The next save replaces it
+    poll_scheduler.mark_polled(["1"], inserted=2)
+
+    with open(state_path, encoding="utf-8") as f:
+        state = json.load(f)
+
+    assert "1" in state["last_polled"]
+    assert poll_scheduler.last_insert_at() == state["last_insert_at"]
+
+
+def test_save_state_uses_a_per_process_temp_file(state_path, monkeypatch):
+    written = []
+    replace = os.replace
+    monkeypatch.setattr(poll_scheduler.os, "replace", lambda src, dst: written.append(src) or replace(src, dst))
+
+    poll_scheduler.save_state({"last_polled": {}, "rates": {}, "rates_at": 0})
+
+    assert written == [f"{state_path}.{os.getpid()}.tmp"]
+    assert os.listdir(os.path.dirname(state_path)) == ["poll_state.json"]
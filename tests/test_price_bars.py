@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+
+from sync_prices_snapshot import roll_minute_bar
+
+
+def at(hour, minute, second=0):
+    # 2026-01-05 is a Monday; times are UTC (IST 09:15 is 03:45 UTC)
+    return datetime(2026, 1, 5, hour, minute, second, tzinfo=timezone.utc)
+
+
+def test_first_quote_without_state_does_not_take_day_volume():
+    bar = roll_minute_bar(None, at(6, 0, 5), 101.0, 2_500_000)
+
+    assert bar["volume"] == 0
+    assert bar["base_volume"] == 2_500_000
+
+    # Later quotes in the same minute only count what traded since
+    bar = roll_minute_bar({"price": 101.0, "volume": 2_500_000, "bar": bar}, at(6, 0, 40), 101.5, 2_500_900)
+    assert bar["volume"] == 900
+
+
+def test_next_bar_is_measured_from_the_last_cumulative_volume():
+    first = roll_minute_bar(None, at(6, 0, 5), 101.0, 1000)
+    previous = {"price": 101.0, "volume": 1500, "bar": {**first, "volume": 500}}
+
+    bar = roll_minute_bar(previous, at(6, 1, 10), 100.5, 1800)
+
+    assert bar["start"] == at(6, 1).isoformat()
+    assert bar["volume"] == 300
+
+
+def test_previous_day_state_is_not_used_as_base():
+    yesterday = roll_minute_bar(None, datetime(2026, 1, 2, 9, 59, tzinfo=timezone.utc), 99.0, 4_000_000)
+    previous = {"price": 99.0, "volume": 4_000_000, "bar": yesterday}
+
+    bar = roll_minute_bar(previous, at(4, 30), 100.0, 750_000)
+
+    assert bar["trade_date"] == "2026-01-05"
+    assert bar["volume"] == 0
@@ -0,0 +1,64 @@
+import multiprocessing
+
+import pytest
+
+import reference_cache
+from storage import SQLiteStorage
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(reference_cache, "CACHE_DIR", str(tmp_path / "reference"))
+
+
+def load_companies(storage):
+    entry = reference_cache.load_reference(storage, "companies", "all", storage.fetch_companies)
+    return [row["symbol"] for row in entry["rows"]]
+
+
+def test_cache_is_scoped_to_the_backend(tmp_path):
+    first = SQLiteStorage(str(tmp_path / "first.db"))
+    second = SQLiteStorage(str(tmp_path / "second.db"))
+
+    # Same version row in both databases, different contents
+    first.upsert_companies([{"symbol": "ACME", "name": "Acme", "exchange": "NSE"}])
+    second.upsert_companies([{"symbol": "GLOBEX", "name": "Globex", "exchange": "NSE"}])
+
+    assert load_companies(first) == ["ACME"]
+    assert load_companies(second) == ["GLOBEX"]
+
+
+def test_bump_invalidates_cached_rows(sqlite_storage):
+    assert load_companies(sqlite_storage) == []
+
+    sqlite_storage.upsert_companies([{"symbol": "ACME", "name": "Acme", "exchange": "NSE"}])
+    assert load_companies(sqlite_storage) == []
+
+    reference_cache.bump_version(sqlite_storage, "companies")
+    assert load_companies(sqlite_storage) == ["ACME"]
+
+
+def bump_many(path, count, results):
+    storage = SQLiteStorage(path)
+    results.put([reference_cache.bump_version(storage, "companies") for _ in range(count)])
+
+
+def test_concurrent_bumps_never_share_a_version(tmp_path):
+    path = str(tmp_path / "shared.db")
+    SQLiteStorage(path).get_reference_version("companies")
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=bump_many, args=(path, 25, results)) for _ in range(4)]
+
+    for worker in workers:
+        worker.start()
+
+    versions = [v for _ in workers for v in results.get(timeout=60)]
+
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    assert sorted(versions) == list(range(1, 101))
+    assert SQLiteStorage(path).get_reference_version("companies") == 100
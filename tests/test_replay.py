@@ -0,0 +1,159 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import intraday_engine
+import news_processor
+import reference_cache
+import replay
+from conftest import news_row
+from scoring import build_company_matcher
+
+WINDOW = timedelta(minutes=15)
+MATCHER = build_company_matcher([
+    {"id": 1, "symbol": "ACME", "name": "Acme"},
+    {"id": 2, "symbol": "GLOBEX", "name": "Globex"}
+])
+
+
+def make_articles():
+    headlines = ["Acme posts record profit growth", "Globex loss widens on fraud probe", "Acme order win drives growth"]
+    return [
+        {
+            "id": n + 1,
+            "title": headlines[n % 3],
+            "content": "",
+            "fetched_at": f"2026-01-05T09:{n * 4 % 60:02d}:00" if n < 15 else f"2026-01-05T10:{n % 60:02d}:00"
+        }
+        for n in range(40)
+    ]
+
+
+def run_replay(articles, batch_size):
+    open_signals = {}
+    signals = []
+
+    for start in range(0, len(articles), batch_size):
+        signals.extend(replay.replay_batch(articles[start:start + batch_size], MATCHER, "fetched_at", {}, open_signals, WINDOW))
+
+    return [(s["company_id"], s["signal_type"], s["signal_score"], s["raw_news_ids"]) for s in signals]
+
+
+def test_replay_ignores_input_order():
+    articles = make_articles()
+    expected = run_replay(articles, len(articles))
+
+    shuffled = list(articles)
+    random.Random(7).shuffle(shuffled)
+
+    # A shuffled batch replays as if it had been sorted
+    assert run_replay(shuffled, len(shuffled)) == expected
+    assert len(expected) > 2
+
+
+HEADLINES = [
+    "{} posts record profit growth",
+    "{} loss widens on fraud probe",
+    "{} order win drives growth",
+    "{} shares fall after downgrade",
+    "{} announces buyback as profit beats",
+    "{} holds annual meeting"
+]
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_live_pipeline_matches_replay(sqlite_storage, tmp_path, monkeypatch, shuffle):
+    monkeypatch.setattr(reference_cache, "CACHE_DIR", str(tmp_path / "reference"))
+    monkeypatch.setattr(news_processor, "storage", sqlite_storage)
+    monkeypatch.setattr(intraday_engine, "storage", sqlite_storage)
+    monkeypatch.setattr(intraday_engine, "send_telegram_alert", lambda message: None)
+    monkeypatch.setattr(intraday_engine, "publish_signal", lambda signal: None)
+
+    sqlite_storage.upsert_companies([
+        {"symbol": "ACME", "name": "Acme", "exchange": "NSE"},
+        {"symbol": "GLOBEX", "name": "Globex", "exchange": "NSE"}
+    ])
+
+    rng = random.Random(11)
+    start = datetime(2026, 1, 5, 9, 0)
+    rows = [
+        news_row(
+            n,
+            fetched_at=(start + timedelta(minutes=rng.randrange(180))).isoformat(),
+            title=rng.choice(HEADLINES).format(rng.choice(["Acme", "Globex"])),
+            content=""
+        )
+        for n in range(80)
+    ]
+
+    # Shuffled ids no longer follow fetch time
+    if shuffle:
+        rng.shuffle(rows)
+
+    for row in rows:
+        sqlite_storage.insert_news_if_new(row)
+
+    news_processor.process_news()
+    intraday_engine.generate_intraday_signals()
+
+    with sqlite_storage.connect() as conn:
+        live = [sqlite_storage.decode("signals", r) for r in conn.execute("select * from signals").fetchall()]
+        articles = [dict(r) for r in conn.execute("select * from raw_news").fetchall()]
+
+    replay_articles = list(articles)
+    if shuffle:
+        rng.shuffle(replay_articles)
+
+    replayed = replay.replay_batch(
+        replay_articles,
+        build_company_matcher(sqlite_storage.fetch_companies()),
+        "fetched_at",
+        {},
+        {},
+        timedelta(minutes=intraday_engine.SIGNAL_WINDOW_MINUTES)
+    )
+
+    def summary(signals):
+        return sorted(
+            (s["company_id"], s["signal_type"], s["severity"], s["signal_score"], s["raw_news_ids"])
+            for s in signals
+        )
+
+    assert len(live) > 5
+    assert summary(live) == summary(replayed)
+
+
+def test_prices_are_last_quote_at_or_before():
+    index = replay.build_price_index([
+        {"company_id": 1, "price": 100, "created_at": "2026-01-05T09:15:00"},
+        {"company_id": 1, "price": 104, "created_at": "2026-01-05T10:00:00"},
+        {"company_id": 2, "price": 50, "created_at": "2026-01-05T11:00:00"}
+    ], "created_at")
+
+    at = replay.parse_time
+
+    assert replay.price_as_of(index, 1, at("2026-01-05T09:10:00")) is None
+    assert replay.price_as_of(index, 1, at("2026-01-05T09:15:00")) == 100
+    # Unchanged since the 09:15 quote, not the next change at 10:00
+    assert replay.price_as_of(index, 1, at("2026-01-05T09:59:00")) == 100
+    # Known up to the newest quote in the dump, whichever company it is for
+    assert replay.price_as_of(index, 1, at("2026-01-05T11:00:00")) == 104
+    assert replay.price_as_of(index, 1, at("2026-01-05T11:01:00")) is None
+    assert replay.price_as_of(index, 3, at("2026-01-05T10:00:00")) is None
+
+
+def test_outcomes_use_prices_as_of_each_horizon():
+    index = replay.build_price_index([
+        {"company_id": 1, "price": 100, "created_at": "2026-01-05T09:15:00"},
+        {"company_id": 1, "price": 110, "created_at": "2026-01-05T09:40:00"},
+        {"company_id": 1, "price": 110, "created_at": "2026-01-05T10:30:00"}
+    ], "created_at")
+
+    signal = {"company_id": 1, "signal_type": "BUY", "generated_at": replay.parse_time("2026-01-05T09:20:00")}
+    replay.attach_outcomes(signal, index, {"15m": timedelta(minutes=15), "1h": timedelta(hours=1), "1d": timedelta(days=1)})
+
+    assert signal["entry_price"] == 100
+    assert signal["outcomes"]["15m"] == {"return_pct": 0.0, "hit": False}
+    assert signal["outcomes"]["1h"] == {"return_pct": 10.0, "hit": True}
+    assert signal["outcomes"]["1d"] is None
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+import sentiment_model
+
+
+def test_missing_model_fails_with_instructions(tmp_path):
+    path = str(tmp_path / "sentiment_v1.npz")
+
+    with pytest.raises(Exception, match="Train one with"):
+        sentiment_model.load_model(path)
+
+
+def test_trained_model_round_trips(tmp_path):
+    texts = [
+        "record profit and strong growth",
+        "shares surge on order win",
+        "net loss widens as sales decline",
+        "stock falls after downgrade",
+        "board meeting scheduled",
+        "company to announce results"
+    ]
+    targets = sentiment_model.np.array([2, 2, 0, 0, 1, 1])
+
+    weights, bias = sentiment_model.train(texts, targets, 2 ** 10, 200, 5.0, 1e-4)
+
+    path = str(tmp_path / "sentiment_v1.npz")
+    sentiment_model.save_model(path, weights, bias, "test")
+    model = sentiment_model.load_model(path)
+
+    labels = [label for label, _ in sentiment_model.predict(model, texts)]
+    assert labels == ["bullish", "bullish", "bearish", "bearish", "neutral", "neutral"]
+    assert model["version"] == "test"
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from signal_feed import SignalFeed
+
+
+def publish(feed, count):
+    for n in range(count):
+        feed.publish({"n": n})
+
+
+def subscribe(feed, cursor):
+    # Queues need a running loop on older Pythons
+    async def run():
+        queue, seq, backlog, notice = feed.subscribe(cursor)
+        feed.unsubscribe(queue)
+        return seq, [s for s, _ in backlog], notice
+
+    return asyncio.run(run())
+
+
+def test_resume_from_cursor_in_buffer():
+    feed = SignalFeed(10)
+    publish(feed, 5)
+
+    assert subscribe(feed, f"{feed.epoch}-3") == (3, [4, 5], None)
+    assert subscribe(feed, "3") == (3, [4, 5], None)
+
+
+def test_cursor_older_than_buffer_reports_gap():
+    feed = SignalFeed(3)
+    publish(feed, 6)
+
+    assert subscribe(feed, f"{feed.epoch}-1") == (1, [4, 5, 6], "gap")
+
+
+@pytest.mark.parametrize("cursor", ["500", "18c0f00d000-500", "18c0f00d000-2"])
+def test_cursor_from_before_a_restart_resets(cursor):
+    feed = SignalFeed(10)
+    publish(feed, 3)
+
+    assert subscribe(feed, cursor) == (0, [1, 2, 3], "reset")
+
+
+def test_frames_carry_epoch_in_event_id():
+    feed = SignalFeed(10)
+    publish(feed, 1)
+
+    assert feed.buffer[0][1].startswith(f"id: {feed.epoch}-1\n".encode())
+
+
+def test_bad_cursor_is_rejected_before_subscribing():
+    feed = SignalFeed(10)
+
+    with pytest.raises(ValueError):
+        subscribe(feed, "not-a-cursor")
+    assert not feed.subscribers
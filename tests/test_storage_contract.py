@@ -0,0 +1,171 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import news_row
+from storage import SupabaseStorage
+
+# Every backend behind get_storage() must pass this module. The Supabase run
+# needs a disposable project with sql/ applied:
+#   SUPABASE_TEST_URL=... SUPABASE_TEST_KEY=... python -m pytest tests/
+
+
+@pytest.fixture(params=["sqlite", "supabase"])
+def storage(request, sqlite_storage):
+    if request.param == "sqlite":
+        return sqlite_storage
+
+    url = os.getenv("SUPABASE_TEST_URL")
+    key = os.getenv("SUPABASE_TEST_KEY")
+
+    if not url or not key:
+        pytest.skip("SUPABASE_TEST_URL / SUPABASE_TEST_KEY not set")
+
+    from supabase import create_client
+    return SupabaseStorage(create_client(url, key))
+
+
+@pytest.fixture
+def tag():
+    # Keeps rows from separate runs apart on a shared Supabase project
+    return uuid.uuid4().hex[:12]
+
+
+def now_iso(**delta):
+    return (datetime.now(timezone.utc) + timedelta(**delta)).isoformat()
+
+
+def insert_news(storage, tag, count):
+    rows = [news_row(f"{tag}-{n}", fetched_at=now_iso()) for n in range(count)]
+
+    for row in rows:
+        assert storage.insert_news_if_new(row)
+
+    return {row["hash_signature"] for row in rows}
+
+
+def test_insert_news_deduplicates_on_hash(storage, tag):
+    row = news_row(tag, fetched_at=now_iso())
+
+    assert storage.insert_news_if_new(row) is True
+    assert storage.insert_news_if_new(dict(row)) is False
+
+
+def test_bump_reference_version_increments(storage, tag):
+    table_name = f"test-{tag}"
+
+    assert storage.bump_reference_version(table_name) == 1
+    assert storage.bump_reference_version(table_name) == 2
+    assert storage.get_reference_version(table_name) == 2
+
+
+def test_claim_and_complete_batch(storage, tag):
+    hashes = insert_news(storage, tag, 3)
+
+    claimed = [
+        r for r in storage.claim_news_batch(f"worker-{tag}", 1000, 300)
+        if r["hash_signature"] in hashes
+    ]
+    assert len(claimed) == 3
+    assert all(r["claimed_by"] == f"worker-{tag}" for r in claimed)
+
+    ids = [r["id"] for r in claimed]
+
+    # Leased rows are not handed to another worker
+    other = storage.claim_news_batch(f"other-{tag}", 1000, 300)
+    assert not {r["id"] for r in other} & set(ids)
+
+    events = [{"raw_news_id": i, "company_id": None, "processed_at": now_iso()} for i in ids]
+
+    assert storage.complete_news_batch(f"worker-{tag}", ids, events) == 3
+    # Completing twice commits nothing new
+    assert storage.complete_news_batch(f"worker-{tag}", ids, events) == 0
+
+    recent = [e for e in storage.fetch_recent_events(now_iso(minutes=-5)) if e["raw_news_id"] in ids]
+    assert sorted(e["raw_news_id"] for e in recent) == sorted(ids)
+
+
+def test_signal_lookup(storage, tag):
+    insert_news(storage, tag, 2)
+    claimed = [r for r in storage.claim_news_batch(f"worker-{tag}", 1000, 300) if tag in r["hash_signature"]]
+    first, second = sorted(r["id"] for r in claimed)
+
+    [company_id] = storage.upsert_companies([{"symbol": f"T{tag}", "name": "Test Co", "exchange": "NSE"}])
+
+    signal = storage.insert_signal({
+        "company_id": company_id,
+        "raw_news_id": first,
+        "raw_news_ids": [first],
+        "signal_type": "BUY",
+        "severity": "MEDIUM",
+        "signal_score": 30,
+        "headline_count": 1,
+        "headlines": ["Test Co bags order win"],
+        "sources": [],
+        "is_active": True,
+        "generated_at": now_iso(),
+        "updated_at": now_iso(),
+        "window_ends_at": now_iso(minutes=15)
+    })
+
+    assert storage.signal_exists(first)
+    assert not storage.signal_exists(second)
+    assert storage.referenced_news_ids([first, second]) == {first}
+
+    opened = storage.fetch_open_signal(company_id, now_iso(), now_iso(minutes=20))
+    assert opened["id"] == signal["id"]
+    assert opened["raw_news_ids"] == [first]
+
+    # A window ending after latest_end does not contain the given time
+    assert storage.fetch_open_signal(company_id, now_iso(minutes=-20), now_iso(minutes=-5)) is None
+
+    storage.update_signal(signal["id"], {"raw_news_ids": [first, second], "headline_count": 2})
+
+    assert storage.signal_exists(second)
+    # Folded articles stay referenced even though raw_news_id is the first one
+    assert storage.referenced_news_ids([first, second]) == {first, second}
+    assert storage.fetch_company_name(company_id) == "Test Co"
+
+
+def test_company_and_price_upserts(storage, tag):
+    symbols = [f"A{tag}", f"B{tag}"]
+
+    ids = storage.upsert_companies([{"symbol": s, "name": s, "exchange": "NSE"} for s in symbols])
+    assert len(ids) == 2
+
+    # Upserting again keeps ids and updates in place
+    again = storage.upsert_companies([{"symbol": s, "name": f"{s} Ltd", "exchange": "NSE"} for s in symbols])
+    assert again == ids
+    assert storage.fetch_company_name(ids[0]) == f"A{tag} Ltd"
+
+    # Inserting only missing companies leaves stored names alone
+    placeholders = [{"symbol": s, "name": s, "exchange": "NSE"} for s in symbols + [f"C{tag}"]]
+    ensured = storage.insert_missing_companies(placeholders)
+    assert [ensured[s] for s in symbols] == ids
+    assert storage.fetch_company_name(ids[0]) == f"A{tag} Ltd"
+    assert storage.fetch_company_name(ensured[f"C{tag}"]) == f"C{tag}"
+
+    storage.insert_prices([{"company_id": ids[0], "price": 101.5, "volume": 1000}])
+
+    prices = [
+        r for r in storage.fetch_expired_rows("prices", "created_at", now_iso(minutes=5), 0, 100000)
+        if r["company_id"] == ids[0]
+    ]
+    assert [float(r["price"]) for r in prices] == [101.5]
+
+    bar = {
+        "company_id": ids[0],
+        "bar_start": "2026-01-05T09:15:00+00:00",
+        "open": 100, "high": 102, "low": 99, "close": 101, "volume": 10
+    }
+    # Upserting on an existing bar key must update, not conflict
+    storage.upsert_minute_bars([bar])
+    storage.upsert_minute_bars([{**bar, "close": 101.5, "volume": 20}])
+
+    storage.upsert_daily_bars([{
+        "company_id": ids[0],
+        "trade_date": "2026-01-05",
+        "open": 100, "high": 102, "low": 99, "close": 101.5, "volume": 20
+    }])
@@ -0,0 +1,46 @@
+import json
+from urllib.parse import unquote
+
+import httpx
+import pytest
+
+postgrest = pytest.importorskip("postgrest")
+
+from storage import SupabaseStorage
+
+
+@pytest.fixture
+def recorded():
+    # Captures the PostgREST requests SupabaseStorage builds, without a server
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=[])
+
+    client = postgrest.SyncPostgrestClient(
+        "http://supabase.test/rest/v1",
+        http_client=httpx.Client(transport=httpx.MockTransport(handler))
+    )
+    return SupabaseStorage(client), requests
+
+
+@pytest.mark.parametrize("raw_news_id", [42, "9b7c1d"])
+def test_signal_exists_sends_jsonb_containment(recorded, raw_news_id):
+    storage, requests = recorded
+
+    assert storage.signal_exists(raw_news_id) is False
+
+    query = unquote(requests[0].url.query.decode())
+    expected = f'[{raw_news_id}]' if isinstance(raw_news_id, int) else f'["{raw_news_id}"]'
+    assert f"raw_news_ids=cs.{expected}" in query
+
+
+def test_referenced_news_ids_checks_every_folded_id(recorded):
+    storage, requests = recorded
+
+    assert storage.referenced_news_ids([7, 8]) == set()
+
+    [request] = requests
+    assert request.url.path.endswith("/rpc/referenced_raw_news")
+    assert json.loads(request.content) == {"p_ids": [7, 8]}
@@ -0,0 +1,162 @@
+import pytest
+from requests.cookies import RequestsCookieJar
+
+import fetch_health
+import sync_nifty_500
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    # Serves scripted responses per URL and records every request
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+        self.cookies = RequestsCookieJar()
+
+    def get(self, url, timeout=None):
+        self.requests.append(url)
+        return self.responses[url].pop(0)
+
+
+INDEX_URL = sync_nifty_500.NSE_INDEX_URL.format(index="NIFTY%20500")
+HOME_URL = sync_nifty_500.NSE_HOME_URL
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_health, "HEALTH_PATH", str(tmp_path / "fetch_health.json"))
+    monkeypatch.setattr(fetch_health, "_cache", {"stamp": None, "state": {}})
+    monkeypatch.setattr(sync_nifty_500, "NSE_COOKIE_PATH", str(tmp_path / "nse_cookies.pkl"))
+    monkeypatch.setattr(sync_nifty_500, "rate_limiter", sync_nifty_500.RateLimiter(1000))
+    monkeypatch.setattr(sync_nifty_500, "warm_generation", 0)
+
+
+def use_session(monkeypatch, responses):
+    session = FakeSession(responses)
+    monkeypatch.setattr(sync_nifty_500, "session", session)
+    return session
+
+
+def test_rate_limiter_spaces_requests(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(sync_nifty_500.time, "monotonic", lambda: 100.0)
+    monkeypatch.setattr(sync_nifty_500.time, "sleep", sleeps.append)
+
+    limiter = sync_nifty_500.RateLimiter(2)
+
+    for _ in range(3):
+        limiter.wait()
+
+    # Three calls at the same instant are released 0.5s apart
+    assert sleeps == [0.5, 1.0]
+
+
+@pytest.mark.parametrize("status", [401, 403])
+def test_rejected_cookies_rewarm_once(monkeypatch, status):
+    session = use_session(monkeypatch, {
+        INDEX_URL: [FakeResponse(status), FakeResponse(200, {"data": []})],
+        HOME_URL: [FakeResponse(200)]
+    })
+
+    assert sync_nifty_500.request_index("NIFTY 500") == []
+    assert session.requests == [INDEX_URL, HOME_URL, INDEX_URL]
+    assert sync_nifty_500.warm_generation == 1
+
+
+def test_other_errors_do_not_rewarm(monkeypatch):
+    session = use_session(monkeypatch, {INDEX_URL: [FakeResponse(500)]})
+
+    with pytest.raises(Exception, match="NSE API failed: 500"):
+        sync_nifty_500.request_index("NIFTY 500")
+
+    assert session.requests == [INDEX_URL]
+
+
+def test_second_rejection_is_not_retried(monkeypatch):
+    session = use_session(monkeypatch, {
+        INDEX_URL: [FakeResponse(403), FakeResponse(403)],
+        HOME_URL: [FakeResponse(200)]
+    })
+
+    with pytest.raises(Exception, match="NSE API failed: 403"):
+        sync_nifty_500.request_index("NIFTY 500")
+
+    assert session.requests == [INDEX_URL, HOME_URL, INDEX_URL]
+
+
+def test_warm_is_skipped_when_another_thread_already_rewarmed(monkeypatch):
+    session = use_session(monkeypatch, {HOME_URL: [FakeResponse(200)]})
+
+    # Both callers saw generation 0 rejected; only the first one re-warms
+    sync_nifty_500.warm_session(0)
+    sync_nifty_500.warm_session(0)
+
+    assert session.requests == [HOME_URL]
+    assert sync_nifty_500.warm_generation == 1
+
+
+def test_cookie_jar_round_trip(monkeypatch):
+    session = use_session(monkeypatch, {})
+    session.cookies.set("nsit", "abc", domain=".nseindia.com")
+
+    sync_nifty_500.save_cookies()
+
+    session = use_session(monkeypatch, {})
+    assert sync_nifty_500.load_cookies() is True
+    assert session.cookies.get("nsit") == "abc"
+
+
+def test_missing_or_corrupt_cookie_jar_is_ignored(monkeypatch):
+    use_session(monkeypatch, {})
+    assert sync_nifty_500.load_cookies() is False
+
+    with open(sync_nifty_500.NSE_COOKIE_PATH, "wb") as f:
+        f.write(b"not a pickle")
+
+    assert sync_nifty_500.load_cookies() is False
+
+
+def test_members_skip_the_index_summary_row(monkeypatch):
+    assert sync_nifty_500.nse_index_name("NIFTY_500") == "NIFTY 500"
+
+    use_session(monkeypatch, {INDEX_URL: [FakeResponse(200, {"data": [
+        {"symbol": "NIFTY 500"},
+        {"symbol": "ACME"},
+        {"priority": 1},
+        {"symbol": "GLOBEX"}
+    ]})]})
+
+    assert sync_nifty_500.fetch_members({"id": 1, "name": "NIFTY_500"}) == ["ACME", "GLOBEX"]
+
+
+def test_sync_members_keeps_stored_names(sqlite_storage, monkeypatch):
+    monkeypatch.setattr(sync_nifty_500, "storage", sqlite_storage)
+
+    [acme] = sqlite_storage.upsert_companies([{"symbol": "ACME", "name": "Acme Ltd", "exchange": "NSE"}])
+
+    sync_nifty_500.sync_members([
+        ({"id": 1, "name": "NIFTY_50"}, ["ACME"]),
+        ({"id": 2, "name": "NIFTY_500"}, ["GLOBEX", "ACME"])
+    ])
+
+    assert sqlite_storage.fetch_company_name(acme) == "Acme Ltd"
+
+    with sqlite_storage.connect() as conn:
+        rows = conn.execute(
+            "select m.index_id, c.symbol, c.name from index_membership m "
+            "join companies c on c.id = m.company_id where m.is_active = 1 order by m.index_id, c.symbol"
+        ).fetchall()
+
+    assert [tuple(r) for r in rows] == [
+        (1, "ACME", "Acme Ltd"),
+        (2, "ACME", "Acme Ltd"),
+        (2, "GLOBEX", "GLOBEX")
+    ]